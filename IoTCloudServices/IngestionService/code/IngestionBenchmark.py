@@ -0,0 +1,110 @@
+# Import required libraries
+import os         # For environment variables
+import json       # For message formatting
+import time       # For throughput measurement
+import random     # For synthetic records
+import tempfile   # For throwaway stores
+import threading  # For the broker delivery thread
+import IngestionService  # Service under test
+
+# Benchmark configuration
+BENCHMARK_RECORDS = int(os.getenv("BENCHMARK_RECORDS", "200000"))  # Messages delivered by the broker stand-in
+BENCHMARK_VEHICLES = int(os.getenv("BENCHMARK_VEHICLES", "1000"))  # Distinct tachographs (load generator fleet size)
+BENCHMARK_BASELINE_RECORDS = int(os.getenv("BENCHMARK_BASELINE_RECORDS", "5000"))  # Messages for the per-row baseline
+BENCHMARK_SEED = int(os.getenv("BENCHMARK_SEED", "42"))
+
+
+class LocalMessage:
+    """Minimal stand-in for paho's MQTTMessage"""
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class LocalBroker:
+    """
+    Stand-in for the MQTT broker.
+    Delivers messages to the subscriber callback from a single network thread, like paho's loop.
+    """
+    def __init__(self, on_message, userdata):
+        self.on_message = on_message
+        self.userdata = userdata
+
+    def deliver(self, messages):
+        thread = threading.Thread(target=self.run, args=(messages,))
+        thread.start()
+        return thread
+
+    def run(self, messages):
+        for message in messages:
+            self.on_message(None, self.userdata, message)
+
+
+def generate_messages(count, vehicles, rng):
+    """
+    Generate encoded messages with the Control Unit formats
+    Roughly 90% telemetry, 9% events and 1% sessions over two days.
+    """
+    start = time.time() * 1000
+    messages = []
+    for index in range(count):
+        vehicle = f"tachograph_control_unit-{rng.randrange(vehicles)}"
+        timestamp = start + index * (172800000 / count)
+        position = {"latitude": 40.3 + rng.random() / 10, "longitude": -3.7 - rng.random() / 10}
+        draw = rng.random()
+        if draw < 0.90:
+            kind = "telemetry"
+            record = {"tachograph_id": vehicle, "Position": position, "GPSSpeed": rng.uniform(0, 120),
+                      "Speed": rng.uniform(0, 120), "driver_present": "Driver 1", "Timestamp": timestamp}
+        elif draw < 0.99:
+            kind = "event"
+            record = {"tachograph_id": vehicle,
+                      "Timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(timestamp / 1000)),
+                      "Position": position, "Event": "Overspeed", "Description": "Speed above limit (90 km/h)."}
+        else:
+            kind = "session"
+            record = {"tachograph_id": vehicle, "Status": "On", "Timestamp": timestamp}
+        messages.append(LocalMessage(f"/fic/tachographs/{vehicle}/{kind}/", bytes(json.dumps(record), "utf-8")))
+    return messages
+
+
+def benchmark_micro_batches(messages):
+    """Measure end-to-end throughput through the micro-batcher"""
+    with tempfile.TemporaryDirectory() as root:
+        store = IngestionService.PartitionedStore(root)
+        batcher = IngestionService.MicroBatcher(store, verbose=False)
+        batcher.start()
+        started = time.perf_counter()
+        LocalBroker(IngestionService.on_message, batcher).deliver(messages).join()
+        batcher.stop()
+        elapsed = time.perf_counter() - started
+        store.close()
+    return batcher.stored / elapsed
+
+
+def benchmark_per_row(messages):
+    """Measure the throughput of one insert and commit per message"""
+    class PerRowWriter:
+        def __init__(self, store):
+            self.store = store
+
+        def add(self, kind, tachograph_id, record):
+            self.store.write([(kind, tachograph_id, record)])
+
+    with tempfile.TemporaryDirectory() as root:
+        store = IngestionService.PartitionedStore(root)
+        started = time.perf_counter()
+        LocalBroker(IngestionService.on_message, PerRowWriter(store)).deliver(messages).join()
+        elapsed = time.perf_counter() - started
+        store.close()
+    return len(messages) / elapsed
+
+
+if __name__ == '__main__':
+    rng = random.Random(BENCHMARK_SEED)
+    messages = generate_messages(BENCHMARK_RECORDS, BENCHMARK_VEHICLES, rng)
+    print(f"Micro-batched ingestion: {benchmark_micro_batches(messages):,.0f} records/s "
+          f"({BENCHMARK_RECORDS} records, {BENCHMARK_VEHICLES} tachographs)")
+    baseline = messages[:BENCHMARK_BASELINE_RECORDS]
+    print(f"Per-row ingestion:       {benchmark_per_row(baseline):,.0f} records/s "
+          f"({len(baseline)} records)")
@@ -0,0 +1,368 @@
+# Import required libraries
+import os         # For environment variables and paths
+import json       # For message decoding
+import time       # For flush timing
+import datetime   # For timestamps and day partitions
+import sqlite3    # For partitioned storage
+import resource   # For the open files limit
+import threading  # For the background writer
+from collections import OrderedDict, defaultdict
+import paho.mqtt.client as mqtt  # For MQTT communication
+from GracefulKiller import GracefulKiller  # For graceful shutdown handling
+
+# Initialize monitor for graceful shutdown
+monitor = GracefulKiller()
+
+# Ingestion configuration
+STORAGE_PATH = os.getenv("STORAGE_PATH", "data")  # Root directory of the partitioned store
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "5000"))  # Records that trigger a flush
+BATCH_MAX_DELAY = float(os.getenv("BATCH_MAX_DELAY", "1.0"))  # Max seconds a record waits before being flushed
+MAX_OPEN_PARTITIONS = int(os.getenv("MAX_OPEN_PARTITIONS", "2048"))  # Partition files kept open (fleet size x days in flight)
+MAX_PENDING_RECORDS = int(os.getenv("MAX_PENDING_RECORDS", "100000"))  # Records buffered before MQTT delivery is held back
+MAX_PENDING_WAIT = float(os.getenv("MAX_PENDING_WAIT", "10"))  # Seconds a full buffer holds delivery before records are dropped
+FILES_PER_PARTITION = 3  # Database, WAL and shared memory files of an open partition
+RESERVED_FILES = 64  # Files left for sockets and the rest of the process
+SCHEMA_VERSION = 1  # user_version of a partition whose tables are created
+
+# Topics published by the Control Units
+TOPICS = {
+    "telemetry": "/fic/tachographs/+/telemetry/",
+    "event": "/fic/tachographs/+/event/",
+    "session": "/fic/tachographs/+/session/",
+    "driving_time": "/fic/tachographs/+/driving_time/"
+}
+
+# One table per record kind in every partition
+SCHEMAS = {
+    "telemetry": """CREATE TABLE IF NOT EXISTS telemetry (
+                        timestamp REAL, latitude REAL, longitude REAL,
+                        gps_speed REAL, speed REAL, driver_present TEXT, extra TEXT)""",
+    "event": """CREATE TABLE IF NOT EXISTS event (
+                    timestamp TEXT, latitude REAL, longitude REAL,
+                    event TEXT, description TEXT, extra TEXT)""",
+    "session": """CREATE TABLE IF NOT EXISTS session (
+                      timestamp REAL, status TEXT, extra TEXT)""",
+    "driving_time": """CREATE TABLE IF NOT EXISTS driving_time (
+                           timestamp REAL, driver TEXT, driving INTEGER, continuous_driving INTEGER,
+                           daily_driving INTEGER, weekly_driving INTEGER, extra TEXT)"""
+}
+
+INSERTS = {
+    "telemetry": "INSERT INTO telemetry VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "event": "INSERT INTO event VALUES (?, ?, ?, ?, ?, ?)",
+    "session": "INSERT INTO session VALUES (?, ?, ?)",
+    "driving_time": "INSERT INTO driving_time VALUES (?, ?, ?, ?, ?, ?, ?)"
+}
+
+# Fields stored in their own column, anything else goes to "extra"
+COLUMN_FIELDS = {
+    "telemetry": {"tachograph_id", "Timestamp", "Position", "GPSSpeed", "Speed", "driver_present"},
+    "event": {"tachograph_id", "Timestamp", "Position", "Event", "Description"},
+    "session": {"tachograph_id", "Timestamp", "Status"},
+    "driving_time": {"tachograph_id", "Timestamp", "driver", "Driving", "ContinuousDriving",
+                     "DailyDriving", "WeeklyDriving"}
+}
+
+
+def extra_fields(kind, record):
+    """Serialize the fields without a dedicated column"""
+    extra = {key: value for key, value in record.items() if key not in COLUMN_FIELDS[kind]}
+    return json.dumps(extra) if extra else None
+
+
+def build_row(kind, record):
+    """
+    Convert a record into a table row
+    Args:
+        kind: telemetry, event, session or driving_time
+        record: Decoded JSON message
+    Returns:
+        Tuple matching the INSERTS statement of the kind
+    """
+    if kind == "telemetry":
+        position = record.get("Position") or {}
+        return (record.get("Timestamp"), position.get("latitude"), position.get("longitude"),
+                record.get("GPSSpeed"), record.get("Speed"), record.get("driver_present"),
+                extra_fields(kind, record))
+    elif kind == "event":
+        position = record.get("Position") or {}
+        return (record.get("Timestamp"), position.get("latitude"), position.get("longitude"),
+                record.get("Event"), record.get("Description"), extra_fields(kind, record))
+    elif kind == "driving_time":
+        return (record.get("Timestamp"), record.get("driver"), record.get("Driving"),
+                record.get("ContinuousDriving"), record.get("DailyDriving"), record.get("WeeklyDriving"),
+                extra_fields(kind, record))
+    return (record.get("Timestamp"), record.get("Status"), extra_fields(kind, record))
+
+
+def partition_day(record):
+    """
+    Day partition of a record.
+    Events carry a formatted date, every other record epoch milliseconds.
+    """
+    timestamp = record.get("Timestamp")
+    if isinstance(timestamp, str):
+        return timestamp[:10]
+    if timestamp is None:
+        return datetime.date.today().isoformat()
+    return datetime.datetime.fromtimestamp(timestamp / 1000, tz=datetime.timezone.utc).date().isoformat()
+
+
+def raise_open_files_limit(partitions):
+    """
+    Raise the soft open files limit to keep a number of partitions open
+    Returns:
+        Number of partitions the limit allows
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = partitions * FILES_PER_PARTITION + RESERVED_FILES
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        soft = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    if soft == resource.RLIM_INFINITY:
+        return partitions
+    return max(1, min(partitions, (soft - RESERVED_FILES) // FILES_PER_PARTITION))
+
+
+def partition_name(tachograph_id):
+    """Make a tachograph id safe to use as a directory name"""
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in tachograph_id)
+
+
+class PartitionedStore:
+    """
+    SQLite store partitioned by tachograph and day: <root>/<tachograph_id>/<day>.sqlite
+    Recently used partitions are kept open and batches are written with bulk inserts.
+    """
+    def __init__(self, root, max_open_partitions=MAX_OPEN_PARTITIONS):
+        self.root = root
+        self.max_open_partitions = raise_open_files_limit(max_open_partitions)
+        if self.max_open_partitions < max_open_partitions:
+            print(f"{datetime.datetime.now()} - Open files limit allows only {self.max_open_partitions} open partitions")
+        self.connections = OrderedDict()
+        self.dropped = 0
+
+    def connection(self, tachograph_id, day):
+        """Get the connection of a partition, creating the partition if needed"""
+        key = (tachograph_id, day)
+        connection = self.connections.get(key)
+        if connection is not None:
+            self.connections.move_to_end(key)
+            return connection
+
+        directory = os.path.join(self.root, partition_name(tachograph_id))
+        os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(directory, f"{day}.sqlite"), check_same_thread=False)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # WAL mode and the tables persist in the file, set them up only once per partition
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                for kind, schema in SCHEMAS.items():
+                    connection.execute(schema)
+                    connection.execute(f"CREATE INDEX IF NOT EXISTS {kind}_timestamp ON {kind} (timestamp)")
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.connections[key] = connection
+
+        # Close the least recently used partition
+        if len(self.connections) > self.max_open_partitions:
+            _, oldest = self.connections.popitem(last=False)
+            oldest.close()
+        return connection
+
+    def drop(self, kind, tachograph_id, error):
+        """Log and count a record that cannot be stored"""
+        self.dropped += 1
+        print(f"{datetime.datetime.now()} - Dropped {kind} record of {tachograph_id}: {error}")
+
+    def write(self, batch):
+        """
+        Store a batch of records, one transaction per partition.
+        Malformed records are dropped without losing the rest of the batch.
+        Args:
+            batch: List of (kind, tachograph_id, record)
+        Returns:
+            Number of partitions written
+        """
+        partitions = defaultdict(lambda: defaultdict(list))
+        for kind, tachograph_id, record in batch:
+            try:
+                partitions[(tachograph_id, partition_day(record))][kind].append(build_row(kind, record))
+            except (AttributeError, TypeError, ValueError, OverflowError, OSError) as e:
+                self.drop(kind, tachograph_id, e)
+
+        written = 0
+        for (tachograph_id, day), rows_by_kind in partitions.items():
+            try:
+                connection = self.connection(tachograph_id, day)
+                with connection:
+                    for kind, rows in rows_by_kind.items():
+                        connection.executemany(INSERTS[kind], rows)
+            except (sqlite3.Error, OSError) as e:
+                print(f"{datetime.datetime.now()} - Batch of {tachograph_id}/{day} failed ({e}), storing row by row")
+                self.write_rows(tachograph_id, day, rows_by_kind)
+            written += 1
+        return written
+
+    def write_rows(self, tachograph_id, day, rows_by_kind):
+        """Store the rows of a partition one by one, dropping the ones that fail"""
+        for kind, rows in rows_by_kind.items():
+            for row in rows:
+                try:
+                    connection = self.connection(tachograph_id, day)
+                    with connection:
+                        connection.execute(INSERTS[kind], row)
+                except (sqlite3.Error, OSError) as e:
+                    self.drop(kind, tachograph_id, e)
+
+    def close(self):
+        """Close every open partition"""
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+
+class MicroBatcher:
+    """
+    Buffers records received from MQTT and flushes them to the store
+    when BATCH_SIZE records are pending or BATCH_MAX_DELAY has elapsed.
+    When the writer falls behind, a full buffer holds back the MQTT network
+    thread for up to MAX_PENDING_WAIT seconds and then drops records.
+    """
+    def __init__(self, store, batch_size=BATCH_SIZE, max_delay=BATCH_MAX_DELAY, verbose=True,
+                 max_pending=MAX_PENDING_RECORDS, max_pending_wait=MAX_PENDING_WAIT):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.verbose = verbose
+        self.max_pending = max(max_pending, batch_size)
+        self.max_pending_wait = max_pending_wait
+        self.pending = []
+        self.condition = threading.Condition()
+        self.running = True
+        self.stored = 0
+        self.overflowed = 0
+        self.overflowing = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def add(self, kind, tachograph_id, record):
+        """Queue a record (called from the MQTT network thread)"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: len(self.pending) < self.max_pending or not self.running,
+                                           timeout=self.max_pending_wait):
+                self.overflowed += 1
+                if not self.overflowing:
+                    self.overflowing = True
+                    print(f"{datetime.datetime.now()} - Writer behind, {len(self.pending)} records pending, "
+                          f"dropping new records ({self.overflowed} dropped so far)")
+                return
+            if self.overflowing:
+                self.overflowing = False
+                print(f"{datetime.datetime.now()} - Writer caught up, {self.overflowed} records dropped so far")
+            self.pending.append((kind, tachograph_id, record))
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Flush pending records and stop the writer"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+
+    def run(self):
+        """Writer loop"""
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.pending) >= self.batch_size or not self.running,
+                                        timeout=self.max_delay)
+                batch, self.pending = self.pending, []
+                running = self.running
+                # Release the MQTT thread if it waits for room
+                self.condition.notify_all()
+            if batch:
+                started = time.perf_counter()
+                dropped = self.store.dropped
+                try:
+                    partitions = self.store.write(batch)
+                except Exception as e:
+                    # Keep the writer alive whatever happens to one batch
+                    print(f"{datetime.datetime.now()} - Failed to store {len(batch)} records: {e}")
+                else:
+                    stored = len(batch) - (self.store.dropped - dropped)
+                    self.stored += stored
+                    if self.verbose:
+                        print(f"{datetime.datetime.now()} - Stored {stored} records in {partitions} partitions "
+                              f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+            if not running:
+                break
+
+
+def on_connect(client, userdata, flags, rc):
+    """
+    MQTT connection callback
+    Subscribe to the topics published by the Control Units
+    """
+    print(f"Connected with result code {rc}")
+    if rc == 0:
+        for topic in TOPICS.values():
+            client.subscribe(topic, qos=1)
+
+
+def on_message(client, userdata, msg):
+    """
+    MQTT message callback
+    Hand the record to the micro-batcher passed as userdata
+    """
+    topic = msg.topic.strip('/').split('/')
+    kind = topic[-1]
+    if kind not in TOPICS:
+        return
+    try:
+        record = json.loads(msg.payload)
+    except ValueError:
+        print(f"Discarded malformed message on {msg.topic}")
+        return
+    if not isinstance(record, dict):
+        print(f"Discarded non-object message on {msg.topic}")
+        return
+    userdata.add(kind, str(record.get("tachograph_id") or topic[2]), record)
+
+
+def ingest():
+    """
+    Run the ingestion service
+    Consume telemetry, events, sessions and driving time summaries and store them in micro-batches
+    """
+    store = PartitionedStore(STORAGE_PATH)
+    batcher = MicroBatcher(store)
+    batcher.start()
+
+    client = mqtt.Client(userdata=batcher)
+    client.username_pw_set(username="fic_server", password="fic_password")
+    client.on_connect = on_connect
+    client.on_message = on_message
+
+    MQTT_SERVER = os.getenv("MQTT_SERVER_ADDRESS")
+    MQTT_PORT = int(os.getenv("MQTT_SERVER_PORT"))
+    client.connect(MQTT_SERVER, MQTT_PORT, 60)
+    client.loop_start()
+
+    while not monitor.kill_now:
+        time.sleep(1)
+
+    client.loop_stop()
+    client.disconnect()
+    batcher.stop()
+    store.close()
+    print("Ingestion service stopped.")
+
+
+if __name__ == '__main__':
+    try:
+        ingest()
+    except Exception as e:
+        print(f"Fatal error: {e}")
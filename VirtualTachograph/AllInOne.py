@@ -0,0 +1,106 @@
+# Import required libraries
+import os         # For environment variables and paths
+import sys        # For importing the components side by side
+import time       # For startup timing
+import threading  # For running every component in this process
+import datetime   # For timestamps
+
+# Startup time reference
+STARTED = time.perf_counter()
+
+# Make the code directory of every component importable
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+for component_directory in ("ControlUnit", "PositioningSystem", "Odometer", "CardReader", "RoutesGenerator"):
+    sys.path.insert(0, os.path.join(BASE_DIRECTORY, component_directory, "code"))
+
+# Configuration of docker-compose.yml, with distinct ports since all components share one port space.
+# Hosts only name the connections, so the Control Unit identifies components as usual.
+DEFAULT_ENVIRONMENT = {
+    "PYTHONUNBUFFERED": "1",
+    "UC_SIMULATOR_HOST": "tachograph_control_unit",
+    "UC_SIMULATOR_PORT": "5000",
+    "GNSS_SIMULATOR_HOST": "tachograph_positioning_system",
+    "GNSS_SIMULATOR_PORT": "5001",
+    "GPS_SIMULATOR_HOST": "tachograph_positioning_system",
+    "GPS_SIMULATOR_PORT": "5001",
+    "ODOMETER_SIMULATOR_HOST": "tachograph_odometer",
+    "ODOMETER_SIMULATOR_PORT": "6000",
+    "CARD_READER_HOST": "tachograph_card_reader"
+}
+for name, value in DEFAULT_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+
+import Transport
+import ControlUnitSimulator
+import GNSSSimulator
+import OdometerSimulator
+import CardReaderSimulator
+import GenerateRoutes
+from GracefulKiller import GracefulKiller
+
+# One monitor stops every component (each module installed its own signal handlers on import)
+monitor = GracefulKiller()
+for module in (ControlUnitSimulator, GNSSSimulator, OdometerSimulator, CardReaderSimulator, GenerateRoutes):
+    module.monitor = monitor
+
+# Route to simulate
+ROUTE_ORIGIN = os.getenv("ROUTE_ORIGIN", "Ayuntamiento de Leganés")
+ROUTE_DESTINATION = os.getenv("ROUTE_DESTINATION", "Ayuntamiento de Getafe")
+
+
+def start_component(host, target, *args):
+    """
+    Run a component function in a daemon thread.
+    Connections opened by the thread are named after the component host.
+    """
+    def run():
+        Transport.set_client_name(host)
+        try:
+            target(*args)
+        except Exception as e:
+            print(f"{datetime.datetime.now()} - {host} {target.__name__} stopped: {e}")
+
+    thread = threading.Thread(target=run, name=f"{host}-{target.__name__}", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_all_in_one():
+    """
+    Run the Control Unit, GNSS, odometer, card reader and route generator
+    in this process, connected through in-memory queues
+    """
+    Transport.use_memory_transport()
+
+    # Control Unit (MQTT only when a broker is configured)
+    if ControlUnitSimulator.UC_CAPTURE_FILE:
+        ControlUnitSimulator.capture = ControlUnitSimulator.CaptureWriter(ControlUnitSimulator.UC_CAPTURE_FILE)
+    control_unit_host = os.getenv("UC_SIMULATOR_HOST")
+    if os.getenv("MQTT_SERVER_ADDRESS"):
+        start_component(control_unit_host, ControlUnitSimulator.mqtt_communications)
+    start_component(control_unit_host, ControlUnitSimulator.data_logger)
+    start_component(control_unit_host, ControlUnitSimulator.listen_for_components,
+                    ControlUnitSimulator.start_component_listener)
+
+    # Sensors and route generator, which wait for their peers to listen
+    gnss_host = os.getenv("GNSS_SIMULATOR_HOST")
+    start_component(gnss_host, GNSSSimulator.receive_simulation_inputs)
+    start_component(gnss_host, GNSSSimulator.simulate_positioning)
+    odometer_host = os.getenv("ODOMETER_SIMULATOR_HOST")
+    start_component(odometer_host, OdometerSimulator.receive_speed_inputs)
+    start_component(odometer_host, OdometerSimulator.simulate_current_speed)
+    start_component(os.getenv("CARD_READER_HOST"), CardReaderSimulator.simulate_current_driver)
+    start_component("tachograph_route_generator", GenerateRoutes.simulate_route,
+                    {"Origin": ROUTE_ORIGIN, "Destination": ROUTE_DESTINATION})
+
+    print(f"{datetime.datetime.now()} - All-in-one simulator started in "
+          f"{(time.perf_counter() - STARTED) * 1000:.0f} ms")
+    while not monitor.kill_now:
+        time.sleep(0.5)
+
+
+if __name__ == '__main__':
+    try:
+        run_all_in_one()
+    except Exception as e:
+        print(f"Fatal error: {e}")
@@ -1,4 +1,3 @@
-import socket
 import os
 import json
 import time
@@ -6,6 +5,7 @@ import datetime
 import random
 import math
 from GracefulKiller import GracefulKiller
+from Transport import connect
 
 # Initialize graceful shutdown monitor
 monitor = GracefulKiller()
@@ -19,9 +19,8 @@ def simulate_current_driver():
     UC_SIMULATOR_HOST = os.getenv("UC_SIMULATOR_HOST")
     UC_SIMULATOR_PORT = int(os.getenv("UC_SIMULATOR_PORT"))
     
-    # Establish TCP connection with Control Unit
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((UC_SIMULATOR_HOST, UC_SIMULATOR_PORT))
+    # Establish connection with Control Unit, waiting until it listens
+    with connect(UC_SIMULATOR_HOST, UC_SIMULATOR_PORT, monitor) as s:
         
         # Main simulation loop
         while not monitor.kill_now:
@@ -0,0 +1,84 @@
+import time
+
+# Tuning of the adaptive sampling controller
+ACCELERATION_THRESHOLD = 5.0  # Speed change (km/h per second) considered fast
+STATIONARY_SPEED = 1.0  # Speed (km/h) below which the vehicle is considered parked
+THRESHOLD_MARGIN = 10.0  # Distance (km/h) to the overspeed limit considered close
+EVENT_HOLD = 30.0  # Seconds sampling stays fast after an event begins
+EVENT_REPEAT_WINDOW = 30.0  # Seconds within which an event of the same type continues the previous one
+BACKLOG_LIMIT = 500  # Unpublished MQTT records that trigger slower sampling
+SPEED_RATE_SMOOTHING = 0.5  # Weight of the newest speed change in the smoothed rate
+
+
+class AdaptiveSamplingController:
+    """
+    Chooses the GNSS/odometer sampling frequency (seconds) of one vehicle.
+    Samples faster when the speed changes quickly, near event thresholds or
+    during an event, and slower when the vehicle is stationary or the MQTT
+    backlog grows, always within [min_frequency, max_frequency].
+    """
+    def __init__(self, min_frequency, max_frequency, overspeed_limit):
+        self.min_frequency = min_frequency
+        self.max_frequency = max_frequency
+        self.overspeed_limit = overspeed_limit
+        self.last_speed = None
+        self.last_timestamp = None
+        self.speed_rate = 0.0
+        self.event_until = 0.0
+        self.last_events = {}
+
+    def observe_speed(self, speed, timestamp):
+        """
+        Update the smoothed speed change rate
+        Args:
+            speed: Odometer speed in km/h
+            timestamp: Reading time in milliseconds
+        """
+        if self.last_timestamp is not None and timestamp > self.last_timestamp:
+            rate = abs(speed - self.last_speed) / ((timestamp - self.last_timestamp) / 1000)
+            self.speed_rate = (1 - SPEED_RATE_SMOOTHING) * self.speed_rate + SPEED_RATE_SMOOTHING * rate
+        self.last_speed = speed
+        self.last_timestamp = timestamp
+
+    def notify_event(self, event_type, now=None):
+        """
+        Keep sampling fast for a while after an event begins.
+        Events raised again while their condition holds do not extend the hold.
+        """
+        now = now if now is not None else time.time()
+        last_seen = self.last_events.get(event_type)
+        self.last_events[event_type] = now
+        if last_seen is None or now - last_seen > EVENT_REPEAT_WINDOW:
+            self.event_until = max(self.event_until, now + EVENT_HOLD)
+
+    def choose(self, base_frequency, state, backlog, now=None):
+        """
+        Choose the sampling frequency for the next reading
+        Args:
+            base_frequency: Frequency configured through MQTT (seconds)
+            state: Current state of the vehicle
+            backlog: Telemetry and events waiting to be published
+            now: Current time in seconds
+        Returns:
+            Tuple of (frequency in seconds, reason)
+        """
+        now = now if now is not None else time.time()
+        speed = state["Speed"]
+
+        if now < self.event_until:
+            frequency, reason = self.min_frequency, "active event"
+        elif speed >= self.overspeed_limit - THRESHOLD_MARGIN:
+            frequency, reason = base_frequency / 4, "near overspeed threshold"
+        elif state["driver_present"] == "None" and speed >= STATIONARY_SPEED:
+            frequency, reason = base_frequency / 4, "moving without driver"
+        elif self.speed_rate > ACCELERATION_THRESHOLD:
+            frequency, reason = base_frequency / 2, "speed changing"
+        elif speed < STATIONARY_SPEED and state["GPSSpeed"] < STATIONARY_SPEED:
+            frequency, reason = self.max_frequency, "stationary"
+        else:
+            frequency, reason = base_frequency, "cruising"
+
+        if backlog > BACKLOG_LIMIT:
+            frequency, reason = frequency * 2, reason + ", mqtt backlog"
+
+        return min(max(frequency, self.min_frequency), self.max_frequency), reason
@@ -5,8 +5,18 @@ import time
 import datetime
 import os
 import random
+import zlib
+import multiprocessing
+import multiprocessing.connection
 import paho.mqtt.client as mqtt
 from GracefulKiller import GracefulKiller
+from AdaptiveSampling import AdaptiveSamplingController
+from DrivingTime import DrivingTimeRegistry
+from SpeedFusion import SpeedFusion
+from Geofence import GeofenceTracker, load_geofences, DEFAULT_CELL_SIZE
+from SensorCapture import CaptureWriter
+from Transport import listen, resolve_peer_name
+from Diagnostics import Diagnostics
 
 monitor = GracefulKiller()
 
@@ -17,30 +27,76 @@ current_state = {
     "GPSSpeed": 0.0,
     "Speed": 0.0,
     "driver_present": "None",
-    "Timestamp": 0
+    "Timestamp": 0,
+    "SamplingFrequency": 1,
+    "SamplingReason": "configured"
 }
 
+# State of every vehicle handled by this process, keyed by tachograph id
+vehicle_states = {}
+last_times = {}
+sampling_controllers = {}
+speed_fusions = {}
+
+# Driving and rest times keyed by driver card
+driving_time = DrivingTimeRegistry()
+
 # Lists to store telemetry and event logs
 logs_telemetry = []
 logs_event = []
+logs_driving_time = []
 
 # Thread synchronization locks
 lock_telemetry = threading.Lock()
 lock_event = threading.Lock()
+lock_driving_time = threading.Lock()
 lock_current_state = threading.Lock()
 
 # Control flags
 state_changed = False
-last_time = 0
 connection_granted = False
 
 # Generate random tachograph ID and set it in current state
 tachograph_id = "tachograph_control_unit-" + str(random.randint(1, 5))
 current_state["tachograph_id"] = tachograph_id
+vehicle_states[tachograph_id] = current_state
+last_times[tachograph_id] = 0
 
 # Configuration parameters
 telemetry_frequency = 1  # Telemetry sending frequency (seconds)
 odometer_gnss_frequency = 1  # Sensor sampling frequency (seconds)
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "False") == "True"  # Adapt sensor sampling to vehicle state
+MIN_SAMPLING_FREQUENCY = float(os.getenv("MIN_SAMPLING_FREQUENCY", "0.2"))  # Fastest sensor sampling (seconds)
+MAX_SAMPLING_FREQUENCY = float(os.getenv("MAX_SAMPLING_FREQUENCY", "10"))  # Slowest sensor sampling (seconds)
+OVERSPEED_LIMIT = 90.0  # Speed limit (km/h)
+SPEED_FUSION_TOLERANCE = float(os.getenv("SPEED_FUSION_TOLERANCE", "500"))  # Max GPS/odometer timestamp gap to pair (ms)
+SPEED_FUSION_TELEMETRY = os.getenv("SPEED_FUSION_TELEMETRY", "False") == "True"  # Report GPS/odometer statistics in telemetry
+DRIVING_TIME_SUMMARY_INTERVAL = float(os.getenv("DRIVING_TIME_SUMMARY_INTERVAL", "60"))  # Driving time summary period (seconds)
+UC_LISTEN_BACKLOG = int(os.getenv("UC_LISTEN_BACKLOG", "128"))  # Pending sensor connections
+COMPONENT_IDENTIFICATION_TIMEOUT = 5  # Seconds to wait for the first message of unknown clients
+UC_WORKERS = int(os.getenv("UC_WORKERS", "1"))  # Worker processes sharing the sensor port
+MQTT_SHUTDOWN_TIMEOUT = 15  # Seconds a worker may take to disconnect from MQTT on shutdown
+GEOFENCES_FILE = os.getenv("GEOFENCES_FILE")  # GeoJSON file with the geofence zones
+GEOFENCE_CELL_SIZE = float(os.getenv("GEOFENCE_CELL_SIZE", str(DEFAULT_CELL_SIZE)))  # Geofence grid cell size (degrees)
+UC_CAPTURE_FILE = os.getenv("UC_CAPTURE_FILE")  # Record received sensor messages to this file (optional)
+DIAGNOSTICS_DIR = os.getenv("DIAGNOSTICS_DIR", "diagnostics")  # Directory of the diagnostics reports
+
+# Zones each vehicle is in, when geofencing is configured
+geofences = GeofenceTracker(load_geofences(GEOFENCES_FILE, GEOFENCE_CELL_SIZE)) if GEOFENCES_FILE else None
+
+# Capture of the received sensor messages, opened when UC_CAPTURE_FILE is set
+capture = None
+
+# Profiling and memory tracing requested over MQTT
+diagnostics = Diagnostics()
+
+# Number of this worker process when running with UC_WORKERS > 1
+worker_number = None
+
+# Get tachograph component names
+ODOMETER_SIMULATOR_HOST = os.getenv("ODOMETER_SIMULATOR_HOST")
+GNSS_SIMULATOR_HOST = os.getenv("GNSS_SIMULATOR_HOST")
+CARD_READER_HOST = os.getenv("CARD_READER_HOST")
 
 def get_host_name():
     """Get container hostname from environment"""
@@ -52,12 +108,15 @@ def client_listener_card_reader(connection, address):
     Processes card insertion/removal events.
     """
     print(f"{datetime.datetime.now()} - New connection {connection} {address}")
+    connection_id = capture.new_connection() if capture is not None else 0
 
     while not monitor.kill_now:
         data = connection.recv(1024)
         if not data:
             break
         else:
+            if capture is not None:
+                capture.record(connection_id, "CardReader", data)
             data = data.decode("utf-8")
             print(f"{datetime.datetime.now()} - Received message: {data}")
             process_received_message(data)
@@ -68,20 +127,22 @@ def client_listener_positioning_system(connection, address):
     Handle GNSS positioning system connections.
     Processes location and GPS speed data.
     """
-    global odometer_gnss_frequency
     print(f"{datetime.datetime.now()} - New connection {connection} {address}")
+    connection_id = capture.new_connection() if capture is not None else 0
     
     while not monitor.kill_now:
         data = connection.recv(1024)
         if not data:
             break
         else:
+            if capture is not None:
+                capture.record(connection_id, "GPS", data)
             data = data.decode("utf-8")
             print(f"{datetime.datetime.now()} - Received message: {data}")
-            process_received_message(data)
+            sampling_frequency = process_received_message(data)
             # Send sampling frequency to GNSS
             new_frequency_message = {
-                "new_gnss_frequency": odometer_gnss_frequency,
+                "new_gnss_frequency": sampling_frequency,
                 "timestamp": datetime.datetime.timestamp(datetime.datetime.now()) * 1000
                 }
             connection.sendall(bytes(json.dumps(new_frequency_message), "utf-8"))
@@ -91,24 +152,60 @@ def client_listener_odometer(connection, address):
     Handle odometer connections.
     Processes vehicle speed data.
     """
-    global odometer_gnss_frequency
     print(f"{datetime.datetime.now()} - New connection {connection} {address}")
+    connection_id = capture.new_connection() if capture is not None else 0
 
     while not monitor.kill_now:
         data = connection.recv(1024)
         if not data:
             break
         else:
+            if capture is not None:
+                capture.record(connection_id, "Odometer", data)
             data = data.decode("utf-8")
             print(f"{datetime.datetime.now()} - Received message: {data}")
-            process_received_message(data)
+            sampling_frequency = process_received_message(data)
             # Send sampling frequency to odometer
             new_frequency_message = {
-                "new_odometer_frequency": odometer_gnss_frequency,
+                "new_odometer_frequency": sampling_frequency,
                 "timestamp": datetime.datetime.timestamp(datetime.datetime.now()) * 1000
                 }
             connection.sendall(bytes(json.dumps(new_frequency_message), "utf-8"))
 
+def component_from_hostname(hostname):
+    """Component of this vehicle running on a host, None for other clients"""
+    if ODOMETER_SIMULATOR_HOST in hostname.split("."):
+        return "Odometer"
+    elif GNSS_SIMULATOR_HOST in hostname.split("."):
+        return "GPS"
+    elif CARD_READER_HOST in hostname.split("."):
+        return "CardReader"
+    return None
+
+def identify_component(connection, address):
+    """
+    Identify the tachograph component behind a new connection.
+    Uses the hostname of the peer and falls back to the "Type" of its first
+    message, so clients outside the compose network (e.g. the fleet load
+    generator) are also served.
+    """
+    hostname = resolve_peer_name(address)
+    print("Machine name:", hostname)
+
+    component = component_from_hostname(hostname)
+    if component is not None:
+        return component
+
+    # Peek the first message without consuming it
+    connection.settimeout(COMPONENT_IDENTIFICATION_TIMEOUT)
+    try:
+        data = connection.recv(1024, socket.MSG_PEEK)
+        return json.loads(data.decode("utf-8"))["Type"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    finally:
+        connection.settimeout(None)
+
 def upgrade_telemetry_publication_frequency(value):
     """Update telemetry publication frequency"""
     global telemetry_frequency
@@ -121,42 +218,129 @@ def upgrade_sensors_sampling_frequency(value):
     odometer_gnss_frequency = value
     print(f"Sensors sampling frequency updated to {odometer_gnss_frequency} seconds")
 
+def get_vehicle_state(vehicle_id):
+    """
+    Get the state of a vehicle, creating it on its first message.
+    Must be called holding lock_current_state.
+    """
+    state = vehicle_states.get(vehicle_id)
+    if state is None:
+        state = {
+            "tachograph_id": vehicle_id,
+            "Position": None,
+            "GPSSpeed": 0.0,
+            "Speed": 0.0,
+            "driver_present": "None",
+            "Timestamp": 0,
+            "SamplingFrequency": odometer_gnss_frequency,
+            "SamplingReason": "configured"
+        }
+        vehicle_states[vehicle_id] = state
+        last_times[vehicle_id] = 0
+    return state
+
+def get_sampling_controller(vehicle_id):
+    """
+    Get the adaptive sampling controller of a vehicle.
+    Must be called holding lock_current_state.
+    """
+    controller = sampling_controllers.get(vehicle_id)
+    if controller is None:
+        controller = AdaptiveSamplingController(MIN_SAMPLING_FREQUENCY, MAX_SAMPLING_FREQUENCY, OVERSPEED_LIMIT)
+        sampling_controllers[vehicle_id] = controller
+    return controller
+
+def get_speed_fusion(vehicle_id):
+    """
+    Get the GPS/odometer fusion of a vehicle.
+    Must be called holding lock_current_state.
+    """
+    fusion = speed_fusions.get(vehicle_id)
+    if fusion is None:
+        fusion = SpeedFusion(SPEED_FUSION_TOLERANCE)
+        speed_fusions[vehicle_id] = fusion
+    return fusion
+
 def process_received_message(data):
     """
-    Process incoming messages from sensors and update system state
+    Process incoming messages from sensors and update system state.
+    Messages without tachograph_id belong to this Control Unit's own vehicle.
+    Returns the sampling frequency the sensor should use next.
     """
-    global current_state, logs_telemetry, lock_telemetry, lock_current_state
+    global logs_telemetry, lock_telemetry, lock_current_state
     
     copy_current_state = {}
 
     with lock_current_state:
         data = json.loads(data)
-        current_state["Timestamp"] = datetime.datetime.timestamp(datetime.datetime.now()) * 1000
+        state = get_vehicle_state(data.get("tachograph_id", tachograph_id))
+        state["Timestamp"] = datetime.datetime.timestamp(datetime.datetime.now()) * 1000
+        previous_driver = state["driver_present"]
         
         if data["Type"] == "GPS":
-            current_state["Position"] = data["Position"]
-            current_state["GPSSpeed"] = data["Speed"]
+            state["Position"] = data["Position"]
+            state["GPSSpeed"] = data["Speed"]
         elif data["Type"] == "Odometer":
-            current_state["Speed"] = data["Speed"]
+            state["Speed"] = data["Speed"]
         elif data["Type"] == "CardReader":
-            current_state["driver_present"] = data["driver_present"]
+            state["driver_present"] = data["driver_present"]
+
+        # Pair GPS and odometer speeds by their sensor timestamps
+        if data["Type"] in ("GPS", "Odometer"):
+            fusion = get_speed_fusion(state["tachograph_id"])
+            if fusion.add(data["Type"], data.get("Timestamp", state["Timestamp"]), data["Speed"]) and SPEED_FUSION_TELEMETRY:
+                state["SpeedFusion"] = fusion.summary()
+
+        # Report the geofence zones entered and exited
+        if data["Type"] == "GPS" and geofences is not None and state["Position"]:
+            entered, exited = geofences.update(state["tachograph_id"], state["Position"])
+            for zone in exited:
+                generate_event("Geofence Exit", f"Vehicle exited {zone.zone_type or 'zone'} {zone.name}.", state)
+            for zone in entered:
+                generate_event("Geofence Enter", f"Vehicle entered {zone.zone_type or 'zone'} {zone.name}.", state)
+
+        # Update the driving time of the driver cards
+        driving_time_events = []
+        if previous_driver != state["driver_present"] and previous_driver != "None":
+            driving_time_events += driving_time.release(previous_driver, state["Timestamp"])
+        if state["driver_present"] != "None":
+            driving_time_events += driving_time.update(
+                state["driver_present"], state["tachograph_id"], state["Timestamp"], state["Speed"])
+        for event_type, description in driving_time_events:
+            generate_event(event_type, description, state)
+
+        # Choose the GNSS/odometer sampling frequency of the vehicle
+        if ADAPTIVE_SAMPLING:
+            controller = get_sampling_controller(state["tachograph_id"])
+            if data["Type"] == "Odometer":
+                controller.observe_speed(state["Speed"], state["Timestamp"])
+            backlog = len(logs_telemetry) + len(logs_event)
+            state["SamplingFrequency"], state["SamplingReason"] = controller.choose(
+                odometer_gnss_frequency, state, backlog)
+        else:
+            state["SamplingFrequency"], state["SamplingReason"] = odometer_gnss_frequency, "configured"
+        sampling_frequency = state["SamplingFrequency"]
 
-        copy_current_state = current_state.copy()
+        copy_current_state = state.copy()
         print(f"Updated telemetry state: {json.dumps(copy_current_state, indent=4)}")
     
     with lock_telemetry:
         logs_telemetry.append(copy_current_state.copy())
 
-def generate_event(event_type, description):
+    return sampling_frequency
+
+def generate_event(event_type, description, state=None):
     """
-    Generate and log a new event
+    Generate and log a new event for a vehicle (this Control Unit's own by default)
     """
-    global logs_event, lock_event, tachograph_id
+    global logs_event, lock_event
+    if state is None:
+        state = current_state
     with lock_event:
         event = {
-                "tachograph_id": tachograph_id,
+                "tachograph_id": state["tachograph_id"],
                 "Timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "Position": current_state["Position"],
+                "Position": state["Position"],
                 "Event": event_type,
                 "Description": description
             }
@@ -164,21 +348,35 @@ def generate_event(event_type, description):
         print(f"EVENT: {json.dumps(event, indent=4)}")
         logs_event.append(event)
 
+    # Keep sampling fast while a new event develops
+    if ADAPTIVE_SAMPLING:
+        get_sampling_controller(state["tachograph_id"]).notify_event(event_type)
+
 def data_logger():
     """
     Monitor system state and generate events based on conditions
     """
-    global last_time, lock_current_state
+    global lock_current_state
+    last_driving_time_summary = time.time()
     while not monitor.kill_now:
         with lock_current_state:
-            if current_state["Timestamp"] > last_time:
-                if current_state["driver_present"] == "None" and current_state["Speed"] > 0.0:
-                    generate_event("Movement Without Driver", "Vehicle moving without driver.")
-                if current_state["Speed"] > 90.0:
-                    generate_event("Overspeed", "Speed above limit (90 km/h).")
-                if abs(current_state["Speed"] - current_state["GPSSpeed"]) > (0.05 * current_state["Speed"]):
-                    generate_event("Speed Discrepancy", "Difference > 5% between GPS and odometer.")
-                last_time = current_state["Timestamp"]
+            for vehicle_id, state in vehicle_states.items():
+                if state["Timestamp"] > last_times[vehicle_id]:
+                    if state["driver_present"] == "None" and state["Speed"] > 0.0:
+                        generate_event("Movement Without Driver", "Vehicle moving without driver.", state)
+                    if state["Speed"] > OVERSPEED_LIMIT:
+                        generate_event("Overspeed", "Speed above limit (90 km/h).", state)
+                    fusion = speed_fusions.get(vehicle_id)
+                    if fusion is not None and fusion.discrepancy():
+                        generate_event("Speed Discrepancy", "Difference > 5% between GPS and odometer.", state)
+                    last_times[vehicle_id] = state["Timestamp"]
+
+            # Summarise the driving time of the cards used since the last summary
+            if time.time() - last_driving_time_summary >= DRIVING_TIME_SUMMARY_INTERVAL:
+                summaries = driving_time.summaries()
+                with lock_driving_time:
+                    logs_driving_time.extend(summaries)
+                last_driving_time_summary = time.time()
         time.sleep(1)   
 
 def on_connect(client, userdata, flags, rc):
@@ -200,6 +398,9 @@ def on_connect(client, userdata, flags, rc):
         CONFIG_FREQUENCY_TOPIC = f"/fic/tachographs/{get_host_name()}/config_frequency/"
         client.subscribe(CONFIG_FREQUENCY_TOPIC)
 
+        DIAGNOSTICS_TOPIC = f"/fic/tachographs/{get_host_name()}/diagnostics/"
+        client.subscribe(DIAGNOSTICS_TOPIC)
+
 def on_message(client, userdata, msg):
     """
     MQTT message callback
@@ -226,6 +427,40 @@ def on_message(client, userdata, msg):
                 upgrade_telemetry_publication_frequency(json_config_received["Config_Value"])
             elif json_config_received["Config_item"] == "odometer_GNSS_frequency":
                 upgrade_sensors_sampling_frequency(json_config_received["Config_Value"])
+    elif "diagnostics" in topic and connection_granted == True:
+        if json_config_received["tachograph_id"] == tachograph_id:
+            run_diagnostics(client, json_config_received)
+
+def run_diagnostics(client, command):
+    """
+    Run a diagnostics command in its own thread so the MQTT loop keeps running.
+    Reports are written to DIAGNOSTICS_DIR, or published zlib-compressed on
+    the diagnostics result topic when the command has "Output": "mqtt".
+    Every worker answers the command, so reports name the process that made them.
+    """
+    def deliver(name, report):
+        timestamp = datetime.datetime.timestamp(datetime.datetime.now()) * 1000
+        if command.get("Output") == "mqtt":
+            RESULT_TOPIC = f"/fic/tachographs/{get_host_name()}/diagnostics/result/"
+            result = {
+                "tachograph_id": tachograph_id,
+                "Command": name,
+                "Report": report,
+                "Worker": worker_number,
+                "Pid": os.getpid(),
+                "Timestamp": timestamp
+            }
+            client.publish(RESULT_TOPIC, payload=zlib.compress(bytes(json.dumps(result), "utf-8")), qos=1, retain=False)
+            print(f"{datetime.datetime.now()} - Diagnostics {name} published")
+        else:
+            os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+            process = f"worker{worker_number}-{os.getpid()}" if worker_number is not None else str(os.getpid())
+            path = os.path.join(DIAGNOSTICS_DIR, f"{int(timestamp)}-{name}-{process}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(report)
+            print(f"{datetime.datetime.now()} - Diagnostics {name} written to {path}")
+
+    threading.Thread(target=diagnostics.run, args=(command, deliver), daemon=True).start()
 
 def mqtt_communications():
     """
@@ -256,6 +491,7 @@ def mqtt_communications():
         if connection_granted:
             publish_telemetry(client)
             publish_events(client)
+            publish_driving_time(client)
             time.sleep(telemetry_frequency)
         else:
             time.sleep(10)
@@ -295,51 +531,193 @@ def publish_events(client):
             number_events_sent += 1
         logs_event = []
 
+def publish_driving_time(client):
+    """Publish driving time summaries to MQTT broker"""
+    global logs_driving_time, lock_driving_time
+    STATE_TOPIC = f"/fic/tachographs/{get_host_name()}/driving_time/"
+    with lock_driving_time:
+        for summary in logs_driving_time:
+            client.publish(STATE_TOPIC, payload=json.dumps(summary), qos=1, retain=False)
+        logs_driving_time = []
+
+def start_component_listener(component, connection, address, daemon=False):
+    """
+    Start the handler thread matching the component type
+    Args:
+        daemon: Whether the handler thread may be abandoned at exit (workers must not wait for idle sensors)
+    """
+    if component == "Odometer":
+        print("Odometer connection")
+        threading.Thread(target=client_listener_odometer, args=(connection, address), daemon=daemon).start()
+    elif component == "GPS":
+        print("GNSS connection")
+        threading.Thread(target=client_listener_positioning_system, args=(connection, address), daemon=daemon).start()
+    elif component == "CardReader":
+        print("Card reader connection")
+        threading.Thread(target=client_listener_card_reader, args=(connection, address), daemon=daemon).start()
+    else:
+        print(f"Unknown component, closing connection {address}")
+        connection.close()
+
+def listen_for_components(dispatch):
+    """
+    Accept connections from tachograph components.
+    Connections are identified in their own thread, since identification may
+    wait for the first message, so a silent client does not delay the others.
+    Args:
+        dispatch: Called with (component, connection, address) for every accepted connection
+    """
+    def identify_and_dispatch(connection, address):
+        dispatch(identify_component(connection, address), connection, address)
+
+    HOST = get_host_name()
+    PORT = int(os.getenv("UC_SIMULATOR_PORT"))
+
+    with listen(HOST, PORT, UC_LISTEN_BACKLOG) as s:
+        # Wake up periodically so a shutdown request is noticed
+        s.settimeout(1.0)
+
+        print(f"{datetime.datetime.now()} - Waiting for connection...")
+        while not monitor.kill_now:
+            try:
+                connection, address = s.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=identify_and_dispatch, args=(connection, address), daemon=True).start()
+
+def peek_tachograph_id(connection):
+    """Read the tachograph id of the first message without consuming it"""
+    connection.settimeout(COMPONENT_IDENTIFICATION_TIMEOUT)
+    try:
+        data = connection.recv(1024, socket.MSG_PEEK)
+        return json.loads(data.decode("utf-8")).get("tachograph_id", tachograph_id)
+    except (OSError, ValueError, AttributeError):
+        return tachograph_id
+    finally:
+        connection.settimeout(None)
+
+def shard_for(vehicle_id, number_of_workers):
+    """Worker owning a vehicle"""
+    return zlib.crc32(vehicle_id.encode("utf-8")) % number_of_workers
+
+def worker_main(channel, other_channels, number):
+    """
+    Control Unit worker process.
+    Receives accepted sensor connections from the parent and runs the
+    listener, data logger and MQTT threads for its shard of vehicles.
+    """
+    global capture, worker_number
+    worker_number = number
+    for other_channel in other_channels:
+        other_channel.close()
+    # Each worker records its own capture file
+    if UC_CAPTURE_FILE:
+        capture = CaptureWriter(f"{UC_CAPTURE_FILE}.{worker_number}")
+
+    mqtt_thread = threading.Thread(target=mqtt_communications, daemon=True)
+    mqtt_thread.start()
+    threading.Thread(target=data_logger, daemon=True).start()
+
+    while not monitor.kill_now:
+        message, fds, _, _ = socket.recv_fds(channel, 1024, 1)
+        if not message:
+            break
+        component, address = json.loads(message.decode("utf-8"))
+        connection = socket.socket(fileno=fds[0])
+        start_component_listener(component, connection, tuple(address), daemon=True)
+
+    # Let the MQTT client publish the regular disconnection once the parent forwards the shutdown
+    mqtt_thread.join()
+
+def run_workers(number_of_workers):
+    """
+    Run the Control Unit as several worker processes to use more than one core.
+    The parent accepts sensor connections and passes each socket to the worker
+    owning its vehicle (keyed by tachograph id), so all sensors of a vehicle
+    are handled by the same process. Every worker runs its own MQTT client.
+    """
+    context = multiprocessing.get_context("fork")
+    channel_pairs = [socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET) for _ in range(number_of_workers)]
+    all_channels = [channel for pair in channel_pairs for channel in pair]
+
+    workers = []
+    for worker_number, (parent_end, worker_end) in enumerate(channel_pairs):
+        other_channels = [channel for channel in all_channels if channel is not worker_end]
+        worker = context.Process(target=worker_main, args=(worker_end, other_channels, worker_number), daemon=True)
+        worker.start()
+        workers.append(worker)
+    for _, worker_end in channel_pairs:
+        worker_end.close()
+
+    def watch_workers():
+        """Stop the Control Unit when a worker stops (e.g. authorization denied), as a single process would"""
+        stopped = multiprocessing.connection.wait([worker.sentinel for worker in workers])
+        if not monitor.kill_now:
+            worker = next(worker for worker in workers if worker.sentinel in stopped)
+            worker.join()
+            print(f"Worker {worker.pid} stopped with exit code {worker.exitcode}, shutting down")
+            monitor.kill_now = True
+
+    threading.Thread(target=watch_workers, daemon=True).start()
+
+    def hand_off(component, connection, address):
+        if component is None:
+            print(f"Unknown component, closing connection {address}")
+            connection.close()
+            return
+        # The sensors of this vehicle send no tachograph id, skip waiting for their first message
+        if component_from_hostname(resolve_peer_name(address)) is not None:
+            vehicle_id = tachograph_id
+        else:
+            vehicle_id = peek_tachograph_id(connection)
+        shard = shard_for(vehicle_id, number_of_workers)
+        try:
+            socket.send_fds(channel_pairs[shard][0], [bytes(json.dumps([component, address]), "utf-8")], [connection.fileno()])
+            print(f"{component} connection handed to worker {shard}")
+        except OSError as e:
+            print(f"Could not hand {component} connection to worker {shard}: {e}")
+        finally:
+            connection.close()
+
+    try:
+        listen_for_components(hand_off)
+    finally:
+        # Closing the channels makes the workers stop waiting for connections,
+        # SIGTERM makes their MQTT clients disconnect regularly
+        for parent_end, _ in channel_pairs:
+            parent_end.close()
+        for worker in workers:
+            worker.terminate()
+        deadline = time.monotonic() + MQTT_SHUTDOWN_TIMEOUT
+        for worker in workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+        # Workers still running would block the exit of the parent
+        for worker in workers:
+            if worker.is_alive():
+                print(f"Worker {worker.pid} did not stop in {MQTT_SHUTDOWN_TIMEOUT} s, killing it")
+                worker.kill()
+                worker.join()
+
 if __name__ == '__main__':
     try:
-        # Start MQTT communications thread
-        t1 = threading.Thread(target=mqtt_communications, daemon=True)
-        t1.start()
+        if UC_WORKERS > 1:
+            run_workers(UC_WORKERS)
+        else:
+            if UC_CAPTURE_FILE:
+                capture = CaptureWriter(UC_CAPTURE_FILE)
 
-        # Start data logger thread
-        t2 = threading.Thread(target=data_logger, daemon=True)
-        t2.start()
-        
-        # Setup TCP server
-        HOST = get_host_name()
-        PORT = int(os.getenv("UC_SIMULATOR_PORT"))
-
-        # Get tachograph component names
-        ODOMETER_SIMULATOR_HOST = os.getenv("ODOMETER_SIMULATOR_HOST")
-        GNSS_SIMULATOR_HOST = os.getenv("GNSS_SIMULATOR_HOST")
-        CARD_READER_HOST = os.getenv("CARD_READER_HOST")
-
-        # Listen for connections from components
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((HOST, PORT))
-            s.listen(3)
-            
-            while not monitor.kill_now:
-                print(f"{datetime.datetime.now()} - Waiting for connection...")
-                connection, address = s.accept()
+            # Start MQTT communications thread
+            t1 = threading.Thread(target=mqtt_communications, daemon=True)
+            t1.start()
 
-                # Get connecting component's hostname
-                hostname = socket.gethostbyaddr(address[0])
-                print("Machine name:", hostname[0])
-
-                # Start appropriate handler thread based on component type
-                if ODOMETER_SIMULATOR_HOST in hostname[0].split("."):
-                    print("Odometer connection")
-                    threading.Thread(target=client_listener_odometer, args=(connection, address)).start()
-                elif GNSS_SIMULATOR_HOST in hostname[0].split("."):
-                    print("GNSS connection")
-                    threading.Thread(target=client_listener_positioning_system, args=(connection, address)).start()
-                elif CARD_READER_HOST in hostname[0].split("."):
-                    print("Card reader connection")
-                    threading.Thread(target=client_listener_card_reader, args=(connection, address)).start()
-        
-        t1.join()
-        t2.join()
+            # Start data logger thread
+            t2 = threading.Thread(target=data_logger, daemon=True)
+            t2.start()
+
+            # Listen for connections from components
+            listen_for_components(start_component_listener)
+
+            t1.join()
+            t2.join()
     except Exception as e:
         print(f"Fatal error: {e}")
-
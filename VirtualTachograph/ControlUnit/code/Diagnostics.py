@@ -0,0 +1,198 @@
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import traceback
+import tracemalloc
+from collections import Counter
+
+# Limits of the diagnostics commands
+DEFAULT_PROFILE_DURATION = 10  # Seconds
+MAX_PROFILE_DURATION = 300  # Seconds
+DEFAULT_SAMPLING_INTERVAL = 0.01  # Seconds between stack samples
+DEFAULT_TOP = 25  # Entries in profile and allocation reports
+DEFAULT_TRACEMALLOC_FRAMES = 10  # Frames stored per allocation
+MAX_REPORT_SIZE = 256 * 1024  # Characters delivered per report
+
+
+def collapsed_stack(frame, thread_name):
+    """Stack of a frame in collapsed format: thread;outermost;...;innermost"""
+    functions = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    functions.append(thread_name)
+    return ";".join(reversed(functions))
+
+
+def truncate_report(report):
+    """Keep a report within MAX_REPORT_SIZE"""
+    if len(report) <= MAX_REPORT_SIZE:
+        return report
+    return report[:MAX_REPORT_SIZE] + f"\n# Truncated, {len(report) - MAX_REPORT_SIZE} more characters"
+
+
+def thread_names():
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every other thread with sys._current_frames.
+    The report uses the collapsed stack format of flame graph tools.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self.sampled = 0
+        self.stopped = threading.Event()
+
+    def run(self, duration):
+        own_thread = threading.get_ident()
+        names = thread_names()
+        deadline = time.monotonic() + duration
+        while not self.stopped.wait(self.interval) and time.monotonic() < deadline:
+            frames = sys._current_frames()
+            if frames.keys() - names.keys():
+                names = thread_names()
+            for ident, frame in frames.items():
+                if ident != own_thread:
+                    self.samples[collapsed_stack(frame, names.get(ident, str(ident)))] += 1
+            self.sampled += 1
+
+    def stop(self):
+        self.stopped.set()
+
+    def report(self, top):
+        lines = [f"# {self.sampled} samples every {self.interval} s, "
+                 f"top {min(top, len(self.samples))} of {len(self.samples)} stacks"]
+        lines += [f"{stack} {count}" for stack, count in self.samples.most_common(top)]
+        return "\n".join(lines)
+
+
+class DeterministicProfiler:
+    """
+    cProfile for a fixed time.
+    Covers every thread on Python 3.12+ (sys.monitoring), only the profiling
+    thread itself on older interpreters.
+    """
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.stopped = threading.Event()
+
+    def run(self, duration):
+        self.profile.enable()
+        try:
+            self.stopped.wait(duration)
+        finally:
+            self.profile.disable()
+
+    def stop(self):
+        self.stopped.set()
+
+    def report(self, top):
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(top)
+        return stream.getvalue()
+
+
+class Diagnostics:
+    """
+    On-demand diagnostics of a running process.
+    Nothing runs and nothing is traced until a command starts it.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profiler = None
+        self.snapshot = None
+
+    def run(self, command, deliver):
+        """
+        Run a diagnostics command
+        Args:
+            command: {"Command": start_profile, stop_profile, start_tracemalloc,
+                      tracemalloc_snapshot, stop_tracemalloc or dump_stacks, plus its options}
+            deliver: Called with (command name, report text) for every result
+        """
+        name = command.get("Command")
+        deliver_report = deliver
+
+        def deliver(name, report):
+            deliver_report(name, truncate_report(report))
+
+        try:
+            if name == "start_profile":
+                self.start_profile(command, deliver)
+            elif name == "stop_profile":
+                self.stop_profile()
+            elif name == "start_tracemalloc":
+                tracemalloc.start(int(command.get("Frames", DEFAULT_TRACEMALLOC_FRAMES)))
+                deliver(name, f"tracemalloc started, {tracemalloc.get_traceback_limit()} frames per allocation")
+            elif name == "tracemalloc_snapshot":
+                deliver(name, self.tracemalloc_snapshot(int(command.get("Top", DEFAULT_TOP))))
+            elif name == "stop_tracemalloc":
+                tracemalloc.stop()
+                self.snapshot = None
+                deliver(name, "tracemalloc stopped")
+            elif name == "dump_stacks":
+                deliver(name, self.dump_stacks())
+            else:
+                raise ValueError(f"Unknown diagnostics command: {name}")
+        except (ValueError, RuntimeError) as e:
+            deliver(name, f"Error: {e}")
+
+    def start_profile(self, command, deliver):
+        """Profile for Duration seconds (or until stop_profile) and deliver the report"""
+        duration = min(float(command.get("Duration", DEFAULT_PROFILE_DURATION)), MAX_PROFILE_DURATION)
+        top = int(command.get("Top", DEFAULT_TOP))
+        if command.get("Profiler", "sampling") == "cprofile":
+            profiler = DeterministicProfiler()
+        else:
+            profiler = SamplingProfiler(float(command.get("Interval", DEFAULT_SAMPLING_INTERVAL)))
+
+        with self.lock:
+            if self.profiler is not None:
+                raise RuntimeError("A profile is already running")
+            self.profiler = profiler
+        try:
+            profiler.run(duration)
+        finally:
+            with self.lock:
+                self.profiler = None
+        deliver("start_profile", profiler.report(top))
+
+    def stop_profile(self):
+        with self.lock:
+            if self.profiler is None:
+                raise RuntimeError("No profile running")
+            self.profiler.stop()
+
+    def tracemalloc_snapshot(self, top):
+        """Top allocations, as a difference with the previous snapshot if there is one"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not started")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"# Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB"]
+        if self.snapshot is None:
+            lines += [str(statistic) for statistic in snapshot.statistics("lineno")[:top]]
+        else:
+            lines.append("# Difference with the previous snapshot")
+            lines += [str(statistic) for statistic in snapshot.compare_to(self.snapshot, "lineno")[:top]]
+        self.snapshot = snapshot
+        return "\n".join(lines)
+
+    def dump_stacks(self):
+        """Current stack of every thread"""
+        names = thread_names()
+        sections = []
+        for ident, frame in sys._current_frames().items():
+            sections.append(f"# Thread {names.get(ident, ident)} ({ident})\n" + "".join(traceback.format_stack(frame)))
+        return "\n".join(sections)
@@ -0,0 +1,190 @@
+import datetime
+
+# Driving and rest limits of Regulation (EC) No 561/2006, in seconds
+CONTINUOUS_DRIVING_LIMIT = 4.5 * 3600  # Driving before a break is required
+BREAK_DURATION = 45 * 60  # Break that resets continuous driving
+SPLIT_BREAK_FIRST = 15 * 60  # First part of a split break
+SPLIT_BREAK_SECOND = 30 * 60  # Second part of a split break
+DAILY_DRIVING_LIMIT = 9 * 3600  # Daily driving
+EXTENDED_DAILY_DRIVING_LIMIT = 10 * 3600  # Daily driving allowed twice a week
+EXTENDED_DAYS_PER_WEEK = 2
+REDUCED_DAILY_REST = 9 * 3600  # Shortest rest that ends a daily driving period
+WEEKLY_DRIVING_LIMIT = 56 * 3600  # Driving in a fixed week
+FORTNIGHTLY_DRIVING_LIMIT = 90 * 3600  # Driving in two consecutive weeks
+WARNING_MARGIN = 15 * 60  # Time before a limit at which a warning is raised
+MOVING_SPEED = 1.0  # Speed (km/h) above which the vehicle is driving
+
+
+def week_start(timestamp):
+    """Monday 00:00 UTC of the fixed week of a timestamp (milliseconds)"""
+    day = datetime.datetime.fromtimestamp(timestamp / 1000, tz=datetime.timezone.utc).date()
+    return day - datetime.timedelta(days=day.weekday())
+
+
+class DriverTimeAccumulator:
+    """
+    Incremental driving and rest time of one driver card.
+    Every update accounts the time since the previous one to the activity
+    observed then (driving or rest), so each sample costs O(1).
+    """
+    def __init__(self, card, timestamp):
+        self.card = card
+        self.tachograph_id = None
+        self.last_timestamp = timestamp
+        self.driving = False
+        self.continuous_driving = 0.0
+        self.break_time = 0.0
+        self.split_break_started = False
+        self.daily_driving = 0.0
+        self.weekly_driving = 0.0
+        self.previous_week_driving = 0.0
+        self.extended_days = 0
+        self.week = week_start(timestamp)
+        self.reported = set()
+        self.changed = True
+
+    def daily_limit(self):
+        """Daily driving limit, extended while extensions are left this week"""
+        if self.extended_days < EXTENDED_DAYS_PER_WEEK:
+            return EXTENDED_DAILY_DRIVING_LIMIT
+        return DAILY_DRIVING_LIMIT
+
+    def clear_reported(self, *keys):
+        """Allow the limits of a new period to be reported again"""
+        for key in keys:
+            self.reported -= {key, f"{key}_exceeded"}
+
+    def roll_week(self, timestamp):
+        """Start a new fixed week when the timestamp crosses Monday"""
+        week = week_start(timestamp)
+        if week != self.week:
+            consecutive = week - self.week == datetime.timedelta(days=7)
+            self.previous_week_driving = self.weekly_driving if consecutive else 0.0
+            self.weekly_driving = 0.0
+            self.extended_days = 0
+            self.week = week
+            self.clear_reported("weekly", "fortnightly")
+
+    def account_driving(self, seconds):
+        """Add driving time, closing the current break"""
+        # Only a break shorter than a full one, within a driving period, starts a split break
+        if self.continuous_driving > 0 and SPLIT_BREAK_FIRST <= self.break_time < BREAK_DURATION:
+            self.split_break_started = True
+        self.break_time = 0.0
+        self.continuous_driving += seconds
+        self.daily_driving += seconds
+        self.weekly_driving += seconds
+
+    def account_rest(self, seconds):
+        """Add break or rest time, resetting the periods it completes"""
+        self.break_time += seconds
+        if self.continuous_driving > 0 and (
+                self.break_time >= BREAK_DURATION or
+                (self.split_break_started and self.break_time >= SPLIT_BREAK_SECOND)):
+            self.continuous_driving = 0.0
+            self.split_break_started = False
+            self.clear_reported("continuous")
+        if self.break_time >= BREAK_DURATION:
+            self.split_break_started = False
+        if self.daily_driving > 0 and self.break_time >= REDUCED_DAILY_REST:
+            if self.daily_driving > DAILY_DRIVING_LIMIT:
+                self.extended_days += 1
+            self.daily_driving = 0.0
+            self.clear_reported("daily")
+
+    def update(self, timestamp, driving):
+        """
+        Account the time since the previous sample
+        Args:
+            timestamp: Sample time in milliseconds
+            driving: Whether the driver is driving from this sample on
+        Returns:
+            List of (event type, description) for limits approached or exceeded
+        """
+        seconds = (timestamp - self.last_timestamp) / 1000
+        if seconds > 0:
+            self.roll_week(timestamp)
+            if self.driving:
+                self.account_driving(seconds)
+            else:
+                self.account_rest(seconds)
+            self.last_timestamp = timestamp
+            self.changed = True
+        self.driving = driving
+        return self.check_limits()
+
+    def check_limits(self):
+        """Report each limit once per period when approached and when exceeded"""
+        events = []
+        limits = (
+            ("continuous", "Continuous driving", self.continuous_driving, CONTINUOUS_DRIVING_LIMIT, CONTINUOUS_DRIVING_LIMIT),
+            ("daily", "Daily driving", self.daily_driving, DAILY_DRIVING_LIMIT, self.daily_limit()),
+            ("weekly", "Weekly driving", self.weekly_driving, WEEKLY_DRIVING_LIMIT, WEEKLY_DRIVING_LIMIT),
+            ("fortnightly", "Fortnightly driving", self.weekly_driving + self.previous_week_driving,
+             FORTNIGHTLY_DRIVING_LIMIT, FORTNIGHTLY_DRIVING_LIMIT)
+        )
+        for key, name, value, warning_limit, limit in limits:
+            if value >= limit and f"{key}_exceeded" not in self.reported:
+                self.reported |= {key, f"{key}_exceeded"}
+                events.append(("Driving Time Exceeded",
+                               f"{name} of {self.card} is {value / 60:.0f} min, limit {limit / 60:.0f} min."))
+            elif value >= warning_limit - WARNING_MARGIN and key not in self.reported:
+                self.reported.add(key)
+                events.append(("Driving Time Warning",
+                               f"{name} of {self.card} is {value / 60:.0f} min, limit {warning_limit / 60:.0f} min."))
+        return events
+
+    def summary(self):
+        """Compact summary of the driver's times, in seconds"""
+        return {
+            "tachograph_id": self.tachograph_id,
+            "driver": self.card,
+            "Driving": self.driving,
+            "ContinuousDriving": round(self.continuous_driving),
+            "CurrentBreak": round(self.break_time),
+            "DailyDriving": round(self.daily_driving),
+            "WeeklyDriving": round(self.weekly_driving),
+            "FortnightlyDriving": round(self.weekly_driving + self.previous_week_driving),
+            "RemainingContinuous": round(max(CONTINUOUS_DRIVING_LIMIT - self.continuous_driving, 0)),
+            "RemainingDaily": round(max(self.daily_limit() - self.daily_driving, 0)),
+            "Timestamp": self.last_timestamp
+        }
+
+
+class DrivingTimeRegistry:
+    """
+    Driving time accumulators keyed by driver card.
+    A card removed from a vehicle stops driving, and the time until it is
+    seen again is accounted as rest when it comes back, in any vehicle.
+    """
+    def __init__(self):
+        self.drivers = {}
+
+    def update(self, card, tachograph_id, timestamp, speed):
+        """
+        Account a sample of a vehicle driven with a card
+        Returns:
+            List of (event type, description)
+        """
+        accumulator = self.drivers.get(card)
+        if accumulator is None:
+            accumulator = DriverTimeAccumulator(card, timestamp)
+            self.drivers[card] = accumulator
+        accumulator.tachograph_id = tachograph_id
+        return accumulator.update(timestamp, speed > MOVING_SPEED)
+
+    def release(self, card, timestamp):
+        """Account the time until a card was removed and stop its driving"""
+        accumulator = self.drivers.get(card)
+        if accumulator is None:
+            return []
+        return accumulator.update(timestamp, False)
+
+    def summaries(self):
+        """Summaries of the cards updated since the previous call"""
+        summaries = []
+        for accumulator in self.drivers.values():
+            if accumulator.changed:
+                summaries.append(accumulator.summary())
+                accumulator.changed = False
+        return summaries
@@ -0,0 +1,121 @@
+import json
+import math
+from collections import defaultdict
+
+DEFAULT_CELL_SIZE = 0.01  # Grid cell size in degrees (about 1 km)
+
+
+def point_in_ring(longitude, latitude, ring):
+    """Even-odd ray casting test of a point against a closed ring of (longitude, latitude)"""
+    inside = False
+    previous_longitude, previous_latitude = ring[-1]
+    for ring_longitude, ring_latitude in ring:
+        if (ring_latitude > latitude) != (previous_latitude > latitude):
+            crossing = (previous_longitude - ring_longitude) * (latitude - ring_latitude) / \
+                (previous_latitude - ring_latitude) + ring_longitude
+            if longitude < crossing:
+                inside = not inside
+        previous_longitude, previous_latitude = ring_longitude, ring_latitude
+    return inside
+
+
+class Zone:
+    """
+    Geofence zone made of one or more polygons with optional holes.
+    Coordinates follow GeoJSON: (longitude, latitude).
+    """
+    def __init__(self, zone_id, name, zone_type, polygons):
+        self.zone_id = zone_id
+        self.name = name
+        self.zone_type = zone_type
+        self.polygons = polygons
+        longitudes = [point[0] for polygon in polygons for point in polygon[0]]
+        latitudes = [point[1] for polygon in polygons for point in polygon[0]]
+        self.bbox = (min(longitudes), min(latitudes), max(longitudes), max(latitudes))
+
+    def contains(self, longitude, latitude):
+        """Exact point in polygon test"""
+        min_longitude, min_latitude, max_longitude, max_latitude = self.bbox
+        if not (min_longitude <= longitude <= max_longitude and min_latitude <= latitude <= max_latitude):
+            return False
+        for outer, *holes in self.polygons:
+            if point_in_ring(longitude, latitude, outer) and \
+                    not any(point_in_ring(longitude, latitude, hole) for hole in holes):
+                return True
+        return False
+
+
+class GeofenceIndex:
+    """
+    Uniform grid over the zone bounding boxes.
+    A lookup only tests the zones registered in the cell of the point.
+    """
+    def __init__(self, zones, cell_size=DEFAULT_CELL_SIZE):
+        self.zones = {zone.zone_id: zone for zone in zones}
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        for zone in zones:
+            min_longitude, min_latitude, max_longitude, max_latitude = zone.bbox
+            for cell_x in range(self.cell(min_longitude), self.cell(max_longitude) + 1):
+                for cell_y in range(self.cell(min_latitude), self.cell(max_latitude) + 1):
+                    self.cells[(cell_x, cell_y)].append(zone)
+
+    def cell(self, coordinate):
+        return math.floor(coordinate / self.cell_size)
+
+    def zones_at(self, latitude, longitude):
+        """Ids of the zones containing a point"""
+        candidates = self.cells.get((self.cell(longitude), self.cell(latitude)), ())
+        return frozenset(zone.zone_id for zone in candidates if zone.contains(longitude, latitude))
+
+
+def load_geofences(path, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Load geofence zones from a GeoJSON FeatureCollection
+    Args:
+        path: GeoJSON file with Polygon or MultiPolygon features
+        cell_size: Grid cell size in degrees
+    Returns:
+        GeofenceIndex
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        collection = json.load(f)
+
+    zones = []
+    for number, feature in enumerate(collection["features"]):
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+        properties = feature.get("properties") or {}
+        zone_id = str(feature.get("id", properties.get("id", number)))
+        polygons = [[[tuple(point[:2]) for point in ring] for ring in polygon] for polygon in polygons]
+        zones.append(Zone(zone_id, properties.get("name", zone_id), properties.get("type"), polygons))
+    return GeofenceIndex(zones, cell_size)
+
+
+class GeofenceTracker:
+    """Zones each vehicle is in, to report enter and exit transitions"""
+    def __init__(self, index):
+        self.index = index
+        self.inside = {}
+
+    def update(self, vehicle_id, position):
+        """
+        Locate a vehicle
+        Args:
+            vehicle_id: Tachograph id
+            position: {"latitude", "longitude"}
+        Returns:
+            Tuple of (zones entered, zones exited)
+        """
+        zones = self.index.zones_at(position["latitude"], position["longitude"])
+        previous = self.inside.get(vehicle_id, frozenset())
+        self.inside[vehicle_id] = zones
+        if zones == previous:
+            return [], []
+        return ([self.index.zones[zone_id] for zone_id in zones - previous],
+                [self.index.zones[zone_id] for zone_id in previous - zones])
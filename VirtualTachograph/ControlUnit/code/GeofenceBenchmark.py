@@ -0,0 +1,58 @@
+import os
+import time
+import math
+import random
+from Geofence import Zone, GeofenceIndex, DEFAULT_CELL_SIZE
+
+# Benchmark configuration
+BENCHMARK_ZONES = int(os.getenv("BENCHMARK_ZONES", "10000"))  # Zones in the index
+BENCHMARK_FIXES = int(os.getenv("BENCHMARK_FIXES", "100000"))  # GPS fixes located with the index
+BENCHMARK_NAIVE_FIXES = int(os.getenv("BENCHMARK_NAIVE_FIXES", "1000"))  # GPS fixes located by testing every zone
+BENCHMARK_SEED = int(os.getenv("BENCHMARK_SEED", "42"))
+
+# Area covered by the zones (around Madrid)
+MIN_LATITUDE, MAX_LATITUDE = 40.0, 40.8
+MIN_LONGITUDE, MAX_LONGITUDE = -4.2, -3.2
+METERS_PER_DEGREE = 111320.0
+
+
+def random_zone(number, rng):
+    """Irregular polygon of 50 m to 2 km radius"""
+    center_latitude = rng.uniform(MIN_LATITUDE, MAX_LATITUDE)
+    center_longitude = rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+    vertices = rng.randint(6, 16)
+    ring = []
+    for vertex in range(vertices):
+        angle = 2 * math.pi * vertex / vertices
+        radius = rng.uniform(50.0, 2000.0)
+        ring.append((center_longitude + radius * math.cos(angle) / (METERS_PER_DEGREE * math.cos(math.radians(center_latitude))),
+                     center_latitude + radius * math.sin(angle) / METERS_PER_DEGREE))
+    return Zone(str(number), f"Zone {number}", "restricted", [[ring]])
+
+
+def random_fix(rng):
+    return rng.uniform(MIN_LATITUDE, MAX_LATITUDE), rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+
+
+if __name__ == '__main__':
+    rng = random.Random(BENCHMARK_SEED)
+    zones = [random_zone(number, rng) for number in range(BENCHMARK_ZONES)]
+
+    started = time.perf_counter()
+    index = GeofenceIndex(zones, DEFAULT_CELL_SIZE)
+    print(f"Index of {BENCHMARK_ZONES} zones built in {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"({len(index.cells)} cells)")
+
+    fixes = [random_fix(rng) for _ in range(BENCHMARK_FIXES)]
+    started = time.perf_counter()
+    hits = sum(len(index.zones_at(latitude, longitude)) for latitude, longitude in fixes)
+    elapsed = time.perf_counter() - started
+    print(f"Grid index: {BENCHMARK_FIXES / elapsed:,.0f} fixes/s ({elapsed / BENCHMARK_FIXES * 1e6:.1f} us/fix, "
+          f"{hits} zone hits)")
+
+    naive_fixes = fixes[:BENCHMARK_NAIVE_FIXES]
+    started = time.perf_counter()
+    for latitude, longitude in naive_fixes:
+        matches = [zone.zone_id for zone in zones if zone.contains(longitude, latitude)]
+    elapsed = time.perf_counter() - started
+    print(f"Every zone: {len(naive_fixes) / elapsed:,.0f} fixes/s ({elapsed / len(naive_fixes) * 1e6:.1f} us/fix)")
@@ -0,0 +1,116 @@
+import os
+import time
+import heapq
+import asyncio
+import datetime
+from GracefulKiller import GracefulKiller
+from SensorCapture import read_capture
+
+# Initialize monitor for graceful shutdown
+monitor = GracefulKiller()
+
+# Replay configuration
+REPLAY_FILES = os.getenv("REPLAY_FILES", "sensors.capture")  # Comma-separated capture files
+UC_ENDPOINT = os.getenv("UC_ENDPOINT", "localhost:5000")  # Control Unit host:port
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1"))  # 1 = original timing, N = N times faster, 0 = unthrottled
+REPLAY_QUEUE_SIZE = 1000  # Messages read ahead per connection
+
+
+class ReplayStatistics:
+    """Messages replayed and time spent"""
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.sent / elapsed if elapsed > 0 else 0.0
+        print(f"{datetime.datetime.now()} - Replayed {self.sent} messages in {elapsed:.2f} s "
+              f"({rate:.0f} msg/s), {self.failed} failed")
+
+
+async def replay_connection(host, port, queue, statistics):
+    """
+    Replay the messages of one captured sensor connection over a new connection.
+    Like the sensors, waits for the Control Unit reply before sending the next message.
+    """
+    reader, writer = None, None
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        while not monitor.kill_now:
+            payload = await queue.get()
+            if payload is None:
+                break
+            writer.write(payload)
+            await writer.drain()
+            if not await reader.read(1024):
+                break
+            statistics.sent += 1
+    except OSError as e:
+        print(f"Replay connection failed: {e}")
+        statistics.failed += 1
+    finally:
+        if writer is not None:
+            writer.close()
+        # Let the dispatcher finish even if this connection is gone
+        while not queue.empty():
+            queue.get_nowait()
+
+
+def tag_records(file_number, path):
+    """Records of a capture file, tagged with the file they come from"""
+    for record in read_capture(path):
+        yield file_number, record
+
+
+async def replay(paths, endpoint, speed):
+    """
+    Feed captured sensor messages back into a Control Unit.
+    Records of all files are dispatched in arrival order, each captured
+    connection is replayed by its own task.
+    Args:
+        paths: Capture files (e.g. one per Control Unit worker)
+        endpoint: "host:port" of the Control Unit
+        speed: Time scale of the replay (0 = as fast as possible)
+    """
+    host, port = endpoint.rsplit(":", 1)
+    statistics = ReplayStatistics()
+    connections = {}
+
+    # Merge the capture files by arrival time
+    records = heapq.merge(*(tag_records(file_number, path) for file_number, path in enumerate(paths)),
+                          key=lambda item: item[1].arrival)
+
+    first_arrival = None
+    started = time.monotonic()
+    for file_number, record in records:
+        if monitor.kill_now:
+            break
+        if first_arrival is None:
+            first_arrival = record.arrival
+        if speed > 0:
+            delay = (record.arrival - first_arrival) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        key = (file_number, record.connection_id)
+        if key not in connections:
+            queue = asyncio.Queue(REPLAY_QUEUE_SIZE)
+            connections[key] = (queue, asyncio.create_task(replay_connection(host, int(port), queue, statistics)))
+        queue, task = connections[key]
+        if not task.done():
+            await queue.put(record.payload)
+
+    for queue, task in connections.values():
+        if not task.done():
+            await queue.put(None)
+    await asyncio.gather(*(task for _, task in connections.values()))
+    statistics.report()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(replay(REPLAY_FILES.split(","), UC_ENDPOINT, REPLAY_SPEED))
+    except Exception as e:
+        print(f"Fatal error: {e}")
@@ -0,0 +1,79 @@
+import os
+import mmap
+import time
+import struct
+import threading
+from collections import namedtuple
+
+# Capture file layout: MAGIC, then one record per received sensor message:
+# arrival time (f64 epoch seconds), connection id (u32), component (u8),
+# payload length (u32) and the payload exactly as received
+MAGIC = b"TACHOCAP\x01"
+RECORD_HEADER = struct.Struct("<dIBI")
+COMPONENTS = ("Odometer", "GPS", "CardReader")
+
+CaptureRecord = namedtuple("CaptureRecord", ["arrival", "connection_id", "component", "payload"])
+
+
+class CaptureWriter:
+    """
+    Append-only capture of the sensor messages received by a Control Unit.
+    Every record is written with a single append, so a crash loses at most
+    the record being written and the file stays readable.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size == 0:
+            os.write(self.fd, MAGIC)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.records = 0
+
+    def new_connection(self):
+        """Id of a newly accepted sensor connection"""
+        with self.lock:
+            self.connections += 1
+            return self.connections
+
+    def record(self, connection_id, component, payload, arrival=None):
+        """
+        Append a received message
+        Args:
+            connection_id: Id returned by new_connection
+            component: "Odometer", "GPS" or "CardReader"
+            payload: Raw bytes received
+            arrival: Epoch seconds (now by default)
+        """
+        header = RECORD_HEADER.pack(arrival if arrival is not None else time.time(),
+                                    connection_id, COMPONENTS.index(component), len(payload))
+        with self.lock:
+            os.write(self.fd, header + payload)
+            self.records += 1
+
+    def close(self):
+        os.close(self.fd)
+
+
+def read_capture(path):
+    """
+    Iterate over the records of a capture file, memory-mapped.
+    A truncated last record (capture interrupted while writing) is ignored.
+    Yields:
+        CaptureRecord
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError(f"{path} is not a sensor capture")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as capture:
+            if capture[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a sensor capture")
+            offset = len(MAGIC)
+            while offset + RECORD_HEADER.size <= size:
+                arrival, connection_id, component, length = RECORD_HEADER.unpack_from(capture, offset)
+                start = offset + RECORD_HEADER.size
+                if start + length > size:
+                    break
+                yield CaptureRecord(arrival, connection_id, COMPONENTS[component], capture[start:start + length])
+                offset = start + length
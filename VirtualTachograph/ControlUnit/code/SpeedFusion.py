@@ -0,0 +1,129 @@
+import math
+from collections import deque
+
+# Tuning of the GPS/odometer fusion
+PENDING_SAMPLES = 32  # Unpaired samples kept per sensor
+WINDOW_SIZE = 30  # Pairs in the rolling statistics window
+MIN_PAIRS = 5  # Pairs needed before judging a discrepancy
+DISCREPANCY_RATIO = 0.05  # Allowed mean difference relative to the mean speed
+CONFIDENCE = 2.0  # Standard errors of the mean difference tolerated as noise
+
+
+class RollingWindow:
+    """
+    Mean, variance and max of the last N values, O(1) per update.
+    Running sums give the moments and a monotonic deque gives the max;
+    the sums are rebuilt every N updates so rounding errors do not build up.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.maxima = deque()
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.added = 0
+
+    def add(self, value):
+        self.values.append(value)
+        self.total += value
+        self.total_squares += value * value
+        while self.maxima and self.maxima[-1][1] <= value:
+            self.maxima.pop()
+        self.maxima.append((self.added, value))
+        self.added += 1
+
+        if len(self.values) > self.size:
+            oldest = self.values.popleft()
+            self.total -= oldest
+            self.total_squares -= oldest * oldest
+        if self.maxima[0][0] <= self.added - 1 - self.size:
+            self.maxima.popleft()
+        if self.added % self.size == 0:
+            self.total = sum(self.values)
+            self.total_squares = sum(value * value for value in self.values)
+
+    def count(self):
+        return len(self.values)
+
+    def mean(self):
+        return self.total / len(self.values) if self.values else 0.0
+
+    def variance(self):
+        if not self.values:
+            return 0.0
+        mean = self.mean()
+        return max(self.total_squares / len(self.values) - mean * mean, 0.0)
+
+    def max(self):
+        return self.maxima[0][1] if self.maxima else 0.0
+
+
+class SpeedFusion:
+    """
+    Bounded streaming join of the GPS and odometer speeds of one vehicle.
+    Samples are paired by sensor timestamp within a tolerance and the
+    difference of every pair feeds rolling window statistics, so memory
+    stays constant however long the trip runs.
+    """
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.pending = {"GPS": deque(maxlen=PENDING_SAMPLES), "Odometer": deque(maxlen=PENDING_SAMPLES)}
+        self.delta = RollingWindow(WINDOW_SIZE)
+        self.absolute_delta = RollingWindow(WINDOW_SIZE)
+        self.speed = RollingWindow(WINDOW_SIZE)
+        self.pairs = 0
+
+    def add(self, sensor, timestamp, speed):
+        """
+        Add a sample and pair it with the closest sample of the other sensor
+        Args:
+            sensor: "GPS" or "Odometer"
+            timestamp: Sensor timestamp in milliseconds
+            speed: Speed in km/h
+        Returns:
+            True if the sample was paired
+        """
+        other = self.pending["Odometer" if sensor == "GPS" else "GPS"]
+
+        # Samples of the other sensor too old to pair with this or any later sample
+        while other and other[0][0] < timestamp - self.tolerance:
+            other.popleft()
+
+        best = None
+        for candidate in other:
+            if candidate[0] > timestamp + self.tolerance:
+                break
+            if best is None or abs(candidate[0] - timestamp) < abs(best[0] - timestamp):
+                best = candidate
+        if best is None:
+            self.pending[sensor].append((timestamp, speed))
+            return False
+
+        other.remove(best)
+        odometer_speed, gps_speed = (speed, best[1]) if sensor == "Odometer" else (best[1], speed)
+        self.delta.add(odometer_speed - gps_speed)
+        self.absolute_delta.add(abs(odometer_speed - gps_speed))
+        self.speed.add(odometer_speed)
+        self.pairs += 1
+        return True
+
+    def discrepancy(self):
+        """
+        Whether the odometer and GPS disagree over the window: the mean difference
+        exceeds DISCREPANCY_RATIO of the mean speed beyond its sampling noise
+        """
+        count = self.delta.count()
+        if count < MIN_PAIRS:
+            return False
+        standard_error = math.sqrt(self.delta.variance() / count)
+        return abs(self.delta.mean()) > DISCREPANCY_RATIO * self.speed.mean() + CONFIDENCE * standard_error
+
+    def summary(self):
+        """Window statistics of the odometer - GPS difference (km/h)"""
+        return {
+            "Pairs": self.pairs,
+            "Window": self.delta.count(),
+            "MeanDelta": round(self.delta.mean(), 2),
+            "StdDelta": round(math.sqrt(self.delta.variance()), 2),
+            "MaxDelta": round(self.absolute_delta.max(), 2)
+        }
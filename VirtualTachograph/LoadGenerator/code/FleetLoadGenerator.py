@@ -0,0 +1,365 @@
+# Import required libraries
+import asyncio    # For concurrent simulation of many vehicles
+import bisect     # For locating route segments by elapsed time
+import itertools  # For cumulative segment durations
+import json       # For message formatting
+import os         # For environment variables
+import random     # For seeded simulation variations
+import sqlite3    # For the route catalogue
+import zlib       # For catalogue route decoding
+import time       # For timing and latency measurement
+import datetime   # For report timestamps
+from math import cos, sin, radians, pi  # For synthetic route geometry
+from GracefulKiller import GracefulKiller  # For graceful shutdown handling
+
+# Initialize monitor for graceful shutdown
+monitor = GracefulKiller()
+
+# Load generator configuration
+UC_ENDPOINTS = os.getenv("UC_ENDPOINTS", "tachograph_control_unit:5000")  # Comma-separated host:port list
+FLEET_SIZE = int(os.getenv("FLEET_SIZE", "1000"))  # Number of simulated vehicles
+LOAD_SEED = int(os.getenv("LOAD_SEED", "42"))  # Seed for reproducible runs
+GNSS_RATE = float(os.getenv("GNSS_RATE", "0"))  # GPS messages per second per vehicle (0 = Control Unit frequency)
+ODOMETER_RATE = float(os.getenv("ODOMETER_RATE", "0"))  # Odometer messages per second per vehicle (0 = Control Unit frequency)
+CARD_READER_INTERVAL = float(os.getenv("CARD_READER_INTERVAL", "60"))  # Max seconds between card reader updates
+ROUTES_FILE = os.getenv("ROUTES_FILE")  # JSON file with routes (optional)
+ROUTES_CATALOGUE = os.getenv("ROUTES_CATALOGUE")  # Route catalogue built by RoutesGenerator (optional)
+CATALOGUE_ROUTES = int(os.getenv("CATALOGUE_ROUTES", "256"))  # Routes drawn from the catalogue
+SYNTHETIC_ROUTES = int(os.getenv("SYNTHETIC_ROUTES", "16"))  # Routes to generate when no file is given
+RAMP_UP_SECONDS = float(os.getenv("RAMP_UP_SECONDS", "10"))  # Time to bring the whole fleet online
+REPORT_INTERVAL = float(os.getenv("REPORT_INTERVAL", "5"))  # Seconds between throughput reports
+LOAD_DURATION = float(os.getenv("LOAD_DURATION", "0"))  # Seconds to run (0 = until stopped)
+
+# Reference point for synthetic routes (Leganés)
+BASE_LATITUDE = 40.3281
+BASE_LONGITUDE = -3.7635
+METERS_PER_DEGREE = 111320.0
+
+
+class Route:
+    """
+    Route made of the position segments produced by RoutesGenerator.
+    Each segment has Origin, Destination, Speed (km/h) and Time (seconds).
+    """
+    def __init__(self, segments):
+        self.segments = [segment for segment in segments if segment["Time"] > 0]
+        if not self.segments:
+            raise ValueError("Route has no segments with positive duration")
+        self.ends = list(itertools.accumulate(segment["Time"] for segment in self.segments))
+        self.duration = self.ends[-1]
+
+    def sample(self, elapsed):
+        """
+        Get the interpolated position and speed after driving for some time.
+        Routes are looped so vehicles never run out of data.
+        Args:
+            elapsed: Seconds since the vehicle started the route
+        Returns:
+            Tuple of (position, speed)
+        """
+        route_time = elapsed % self.duration
+        index = bisect.bisect_right(self.ends, route_time)
+        segment = self.segments[index]
+        fraction = 1.0 - (self.ends[index] - route_time) / segment["Time"]
+        origin = segment["Origin"]
+        destination = segment["Destination"]
+        position = {
+            "latitude": origin["latitude"] + fraction * (destination["latitude"] - origin["latitude"]),
+            "longitude": origin["longitude"] + fraction * (destination["longitude"] - origin["longitude"])
+        }
+        return position, segment["Speed"]
+
+
+class LoadStatistics:
+    """Throughput and latency counters shared by all simulated vehicles"""
+    def __init__(self):
+        self.sent = {"GPS": 0, "Odometer": 0, "CardReader": 0}
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.errors = 0
+        self.active_connections = 0
+        self.window_start = time.monotonic()
+
+    def record(self, message_type, latency):
+        """Record an acknowledged message and its round-trip time"""
+        self.sent[message_type] += 1
+        self.latency_sum += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+    def report(self):
+        """Print the throughput of the last window and reset the window counters"""
+        now = time.monotonic()
+        window = max(now - self.window_start, 1e-9)
+        total = sum(self.sent.values())
+        mean_latency = self.latency_sum / total * 1000 if total else 0.0
+        print(f"{datetime.datetime.now()} - {total / window:.0f} msg/s "
+              f"(GPS {self.sent['GPS'] / window:.0f}, "
+              f"Odometer {self.sent['Odometer'] / window:.0f}, "
+              f"CardReader {self.sent['CardReader'] / window:.0f}) - "
+              f"rtt mean {mean_latency:.1f} ms, max {self.latency_max * 1000:.1f} ms - "
+              f"connections {self.active_connections} - errors {self.errors}")
+        self.sent = dict.fromkeys(self.sent, 0)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.window_start = now
+
+
+class SimulatedVehicle:
+    """
+    One vehicle of the fleet.
+    Opens a GPS, an odometer and a card reader connection to its Control Unit
+    and speaks the same request/response protocol as the single-vehicle simulators.
+    """
+    def __init__(self, index, route, endpoint, statistics):
+        self.index = index
+        self.tachograph_id = f"fleet_vehicle-{index}"
+        self.rng = random.Random(LOAD_SEED * 1000003 + index)
+        self.route = route
+        self.endpoint = endpoint
+        self.statistics = statistics
+        # Start each vehicle at a different point of its route
+        self.route_offset = self.rng.uniform(0.0, route.duration)
+        self.gnss_frequency = 1.0 / GNSS_RATE if GNSS_RATE > 0 else 1.0
+        self.odometer_frequency = 1.0 / ODOMETER_RATE if ODOMETER_RATE > 0 else 1.0
+        self.speed_noise = 0.0
+        self.started = time.monotonic()
+
+    def elapsed(self):
+        """Seconds driven along the route"""
+        return time.monotonic() - self.started + self.route_offset
+
+    def gnss_message(self):
+        """Build a GPS message like GNSSSimulator"""
+        position, speed = self.route.sample(self.elapsed())
+        return {
+            "Type": "GPS",
+            "tachograph_id": self.tachograph_id,
+            "Position": position,
+            "Speed": speed,
+            "Timestamp": time.time() * 1000
+        }
+
+    def odometer_message(self):
+        """Build an odometer message with bounded speed noise"""
+        _, speed = self.route.sample(self.elapsed())
+        self.speed_noise = max(-5.0, min(5.0, 0.8 * self.speed_noise + self.rng.uniform(-1.5, 1.5)))
+        return {
+            "Type": "Odometer",
+            "tachograph_id": self.tachograph_id,
+            "Speed": max(0.0, speed + self.speed_noise),
+            "Timestamp": time.time() * 1000
+        }
+
+    def card_reader_message(self):
+        """Build a card reader message like CardReaderSimulator"""
+        is_driver = 1 if self.rng.random() < 0.5 else 0
+        # Every vehicle has its own pool of three driver cards
+        driver_present = f"Driver {self.index * 3 + self.rng.randint(1, 3)}" if is_driver else "None"
+        return {
+            "Type": "CardReader",
+            "tachograph_id": self.tachograph_id,
+            "is_driver": is_driver,
+            "driver_present": driver_present,
+            "Timestamp": time.time() * 1000
+        }
+
+    def next_gnss_interval(self, response):
+        """Follow the sampling frequency sent back by the Control Unit unless a rate is forced"""
+        if GNSS_RATE <= 0:
+            self.gnss_frequency = json.loads(response.decode("utf-8"))["new_gnss_frequency"]
+        return self.gnss_frequency
+
+    def next_odometer_interval(self, response):
+        """Follow the sampling frequency sent back by the Control Unit unless a rate is forced"""
+        if ODOMETER_RATE <= 0:
+            self.odometer_frequency = json.loads(response.decode("utf-8"))["new_odometer_frequency"]
+        return self.odometer_frequency
+
+    def next_card_reader_interval(self, response):
+        """Wait a random time before the next card reader update"""
+        return self.rng.uniform(0.0, CARD_READER_INTERVAL)
+
+    async def stream(self, message_type, build_message, next_interval):
+        """
+        Keep one sensor connection open and send messages until stopped.
+        Reconnects with exponential backoff if the Control Unit is not reachable.
+        """
+        host, port = self.endpoint
+        backoff = 0.5
+        while not monitor.kill_now:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                self.statistics.errors += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 0.5
+            self.statistics.active_connections += 1
+            try:
+                while not monitor.kill_now:
+                    payload = bytes(json.dumps(build_message()), "utf-8")
+                    sent_at = time.perf_counter()
+                    writer.write(payload)
+                    await writer.drain()
+                    response = await reader.read(1024)
+                    if not response:
+                        break
+                    self.statistics.record(message_type, time.perf_counter() - sent_at)
+                    await asyncio.sleep(next_interval(response))
+            except (OSError, ValueError, KeyError):
+                self.statistics.errors += 1
+            finally:
+                self.statistics.active_connections -= 1
+                writer.close()
+            # Do not hammer a Control Unit that keeps dropping the connection
+            await asyncio.sleep(backoff)
+
+    def start(self):
+        """Start the three sensor streams of the vehicle"""
+        return [
+            asyncio.create_task(self.stream("GPS", self.gnss_message, self.next_gnss_interval)),
+            asyncio.create_task(self.stream("Odometer", self.odometer_message, self.next_odometer_interval)),
+            asyncio.create_task(self.stream("CardReader", self.card_reader_message, self.next_card_reader_interval))
+        ]
+
+
+def parse_endpoints(endpoints):
+    """
+    Parse the Control Unit endpoints
+    Args:
+        endpoints: Comma-separated list of host:port
+    Returns:
+        List of (host, port) tuples
+    """
+    parsed = []
+    for endpoint in endpoints.split(","):
+        host, port = endpoint.strip().rsplit(":", 1)
+        parsed.append((host, int(port)))
+    return parsed
+
+
+def load_routes(routes_file):
+    """
+    Load routes from a JSON file.
+    The file holds either one route or a list of routes, each route being
+    the list of positions generated by RoutesGenerator.
+    """
+    with open(routes_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data and isinstance(data[0], dict):
+        data = [data]
+    return [Route(segments) for segments in data]
+
+
+def load_catalogue_routes(catalogue_path, count, rng):
+    """
+    Draw routes from the catalogue built by RoutesGenerator (RouteCatalogue.py)
+    Args:
+        catalogue_path: SQLite file of the catalogue
+        count: Number of routes to draw
+        rng: Seeded random generator
+    Returns:
+        List of Route objects
+    """
+    catalogue = sqlite3.connect(catalogue_path)
+    try:
+        route_ids = [row[0] for row in catalogue.execute("SELECT id FROM routes")]
+        if not route_ids:
+            raise ValueError("Route catalogue is empty")
+        routes = []
+        for route_id in rng.sample(route_ids, min(count, len(route_ids))):
+            (positions,) = catalogue.execute("SELECT positions FROM routes WHERE id = ?", (route_id,)).fetchone()
+            routes.append(Route(json.loads(zlib.decompress(positions).decode("utf-8"))))
+        return routes
+    finally:
+        catalogue.close()
+
+
+def generate_synthetic_routes(rng, count, segments_per_route=200):
+    """
+    Generate random driving routes around Leganés
+    Args:
+        rng: Seeded random generator
+        count: Number of routes to generate
+        segments_per_route: Number of segments of each route
+    Returns:
+        List of Route objects
+    """
+    routes = []
+    for _ in range(count):
+        latitude = BASE_LATITUDE + rng.uniform(-0.05, 0.05)
+        longitude = BASE_LONGITUDE + rng.uniform(-0.05, 0.05)
+        heading = rng.uniform(0.0, 2 * pi)
+        segments = []
+        for _ in range(segments_per_route):
+            heading += rng.uniform(-0.3, 0.3)
+            length = rng.uniform(20.0, 200.0)  # Meters
+            speed = rng.uniform(30.0, 100.0)  # km/h
+            next_latitude = latitude + length * cos(heading) / METERS_PER_DEGREE
+            next_longitude = longitude + length * sin(heading) / (METERS_PER_DEGREE * cos(radians(latitude)))
+            segments.append({
+                "Origin": {"latitude": latitude, "longitude": longitude},
+                "Destination": {"latitude": next_latitude, "longitude": next_longitude},
+                "Speed": speed,
+                "Time": length / (speed / 3.6)
+            })
+            latitude, longitude = next_latitude, next_longitude
+        routes.append(Route(segments))
+    return routes
+
+
+async def report_statistics(statistics):
+    """Periodically print fleet throughput"""
+    while not monitor.kill_now:
+        await asyncio.sleep(REPORT_INTERVAL)
+        statistics.report()
+
+
+async def run_fleet():
+    """
+    Simulate the whole fleet from one event loop.
+    Vehicles are brought online progressively and spread across the Control Unit endpoints.
+    """
+    endpoints = parse_endpoints(UC_ENDPOINTS)
+    rng = random.Random(LOAD_SEED)
+    if ROUTES_FILE:
+        routes = load_routes(ROUTES_FILE)
+    elif ROUTES_CATALOGUE:
+        routes = load_catalogue_routes(ROUTES_CATALOGUE, CATALOGUE_ROUTES, rng)
+    else:
+        routes = generate_synthetic_routes(rng, SYNTHETIC_ROUTES)
+    print(f"{datetime.datetime.now()} - Simulating {FLEET_SIZE} vehicles over {len(routes)} routes "
+          f"against {len(endpoints)} Control Unit endpoint(s)")
+
+    statistics = LoadStatistics()
+    started = time.monotonic()
+    tasks = [asyncio.create_task(report_statistics(statistics))]
+
+    for index in range(FLEET_SIZE):
+        if monitor.kill_now:
+            break
+        route = routes[rng.randrange(len(routes))]
+        vehicle = SimulatedVehicle(index, route, endpoints[index % len(endpoints)], statistics)
+        tasks.extend(vehicle.start())
+        if RAMP_UP_SECONDS > 0:
+            await asyncio.sleep(RAMP_UP_SECONDS / FLEET_SIZE)
+
+    while not monitor.kill_now:
+        if LOAD_DURATION > 0 and time.monotonic() - started >= LOAD_DURATION:
+            break
+        await asyncio.sleep(0.5)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    statistics.report()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(run_fleet())
+    except Exception as e:
+        print(e)
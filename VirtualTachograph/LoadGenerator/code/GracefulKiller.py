@@ -0,0 +1,17 @@
+from datetime import datetime
+import time
+import signal
+import logging
+
+
+class GracefulKiller:
+    def __init__(self):
+        self.kill_now = False
+        signal.signal(signal.SIGINT, self.exit_gracefully)
+        signal.signal(signal.SIGTERM, self.exit_gracefully)
+
+    def exit_gracefully(self, signum, frame):
+        logging.warning('gracefully exiting')
+        self.kill_now = True
+
+
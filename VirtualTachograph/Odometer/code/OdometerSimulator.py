@@ -1,13 +1,12 @@
 # Import required libraries
-import socket      # For TCP/IP communication
 import os         # For environment variables
 import json       # For message formatting
 import time       # For sleep delays
 import datetime   # For timestamps
-import random     # For speed variation simulation
-import math       # For mathematical operations
 import threading  # For parallel execution
 from GracefulKiller import GracefulKiller  # For graceful shutdown handling
+from SpeedTrace import SpeedTrace  # For precomputed speed readings
+from Transport import listen, connect  # For connections between components
 
 # Initialize monitor for graceful shutdown
 monitor = GracefulKiller()
@@ -19,6 +18,9 @@ speed_inputs = []
 # Default sampling frequency in seconds
 frequency = 1.0
 
+# Seed of the speed noise (unset = different noise on every run)
+ODOMETER_SEED = int(os.getenv("ODOMETER_SEED")) if os.getenv("ODOMETER_SEED") else None
+
 def get_host_name():
     """Get container hostname from environment"""
     return os.getenv("HOSTNAME")
@@ -31,9 +33,7 @@ def receive_speed_inputs():
     HOST = get_host_name()
     PORT = int(os.getenv("ODOMETER_SIMULATOR_PORT"))
     
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HOST, PORT))
-        s.listen()
+    with listen(HOST, PORT) as s:
         print("Odometer waiting for route generator connection...")
         conn, addr = s.accept()
         with conn:
@@ -51,46 +51,44 @@ def receive_speed_inputs():
 def simulate_current_speed():
     """
     Simulates vehicle speed readings based on route data.
-    Sends measurements to Control Unit with random variations.
-    Adjusts sampling frequency based on Control Unit feedback.
+    Readings are precomputed by SpeedTrace with bounded, seeded noise and
+    regenerated only when the Control Unit changes the sampling frequency.
     """
     global frequency
     UC_SIMULATOR_HOST = os.getenv("UC_SIMULATOR_HOST")
     UC_SIMULATOR_PORT = int(os.getenv("UC_SIMULATOR_PORT"))
+    trace = SpeedTrace(ODOMETER_SEED)
     
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((UC_SIMULATOR_HOST, UC_SIMULATOR_PORT))
+    with connect(UC_SIMULATOR_HOST, UC_SIMULATOR_PORT, monitor) as s:
         
         while not monitor.kill_now:
-            # Process each speed input from route
-            for speed in speed_inputs:
-                # Calculate number of readings based on time and frequency
-                times = math.trunc(speed["Time"] / frequency) + 1
-                # Add initial random variation to speed
-                random_speed = speed["Speed"] + random.uniform(-5.0, 5.0)
-                
-                # Generate multiple readings for current speed segment
-                while times > 0:
-                    # Add continuous small random variations
-                    random_speed += random.uniform(-5.0, 5.0)
-                    simulated_speed = {
-                        "Type": "Odometer",
-                        "Speed": random_speed,
-                        "Timestamp": datetime.datetime.timestamp(datetime.datetime.now()) * 1000
-                    }
-                    
-                    # Send speed reading to Control Unit
-                    s.sendall(bytes(json.dumps(simulated_speed), "utf-8"))
-                    print(f"{datetime.datetime.now()} - Sent message: {simulated_speed}")
-                    
-                    # Receive new sampling frequency from Control Unit
-                    new_frequency_message = s.recv(1024)
-                    new_frequency_message = new_frequency_message.decode("utf-8")
-                    new_frequency_message = json.loads(new_frequency_message)
-                    frequency = new_frequency_message["new_odometer_frequency"]
-                    print(f"{datetime.datetime.now()} - Will send next message in: {frequency} seconds")
-                    time.sleep(frequency)
-                    times -= 1
+            current_speed = trace.next_speed(speed_inputs, frequency)
+            if current_speed is None:
+                if speed_inputs:
+                    # Route finished, drive it again
+                    trace.rewind()
+                else:
+                    # Wait for route data
+                    time.sleep(0.1)
+                continue
+
+            simulated_speed = {
+                "Type": "Odometer",
+                "Speed": current_speed,
+                "Timestamp": datetime.datetime.timestamp(datetime.datetime.now()) * 1000
+            }
+            
+            # Send speed reading to Control Unit
+            s.sendall(bytes(json.dumps(simulated_speed), "utf-8"))
+            print(f"{datetime.datetime.now()} - Sent message: {simulated_speed}")
+            
+            # Receive new sampling frequency from Control Unit
+            new_frequency_message = s.recv(1024)
+            new_frequency_message = new_frequency_message.decode("utf-8")
+            new_frequency_message = json.loads(new_frequency_message)
+            frequency = new_frequency_message["new_odometer_frequency"]
+            print(f"{datetime.datetime.now()} - Will send next message in: {frequency} seconds")
+            time.sleep(frequency)
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,134 @@
+# Import required libraries
+import math         # For kernel sizing
+import numpy as np  # For vectorised trace generation
+
+# Noise model: Ornstein–Uhlenbeck deviation around the route speed
+NOISE_SIGMA = 2.0       # Stationary standard deviation (km/h)
+NOISE_REVERSION = 0.5   # Mean reversion rate (1/s)
+NOISE_BOUND = 5.0       # Max deviation from the route speed (km/h)
+KERNEL_TOLERANCE = 1e-6  # Weight below which past noise is ignored
+
+def samples_per_segment(segments, frequency):
+    """Number of readings of each segment, as sent by the original sampling loop"""
+    return np.array([math.trunc(segment["Time"] / frequency) + 1 for segment in segments], dtype=np.int64)
+
+def generate_speed_trace(segments, frequency, rng, initial_deviation=0.0):
+    """
+    Precompute the odometer readings of a list of speed segments in one pass.
+    Deviations follow a discretised Ornstein–Uhlenbeck process, an AR(1) with
+    phi = exp(-theta * dt), computed as the convolution of the noise with the
+    kernel phi^k and bounded to +/- NOISE_BOUND.
+    Args:
+        segments: Speed inputs ({"Speed", "Time"}) from the route generator
+        frequency: Sampling period in seconds
+        rng: numpy random Generator
+        initial_deviation: Deviation of the reading preceding the trace
+    Returns:
+        Tuple of (speeds, deviations, segment index of every reading)
+    """
+    counts = samples_per_segment(segments, frequency)
+    total = int(counts.sum()) if len(counts) else 0
+    if total == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+
+    target = np.repeat(np.array([segment["Speed"] for segment in segments], dtype=float), counts)
+    phi = math.exp(-NOISE_REVERSION * frequency)
+    innovations = rng.normal(0.0, NOISE_SIGMA * math.sqrt(1.0 - phi * phi), total)
+
+    if phi < KERNEL_TOLERANCE:
+        deviations = innovations
+    else:
+        kernel_length = min(total, math.ceil(math.log(KERNEL_TOLERANCE) / math.log(phi)) + 1)
+        deviations = np.convolve(innovations, phi ** np.arange(kernel_length))[:total]
+        deviations += initial_deviation * phi ** np.arange(1, total + 1)
+    np.clip(deviations, -NOISE_BOUND, NOISE_BOUND, out=deviations)
+
+    speeds = np.maximum(target + deviations, 0.0)
+    return speeds, deviations, np.repeat(np.arange(len(segments)), counts)
+
+class SpeedTrace:
+    """
+    Odometer readings precomputed from the received speed segments.
+    The trace is extended when new segments arrive and regenerated from the
+    current reading only when the Control Unit changes the sampling frequency.
+    """
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.frequency = None
+        self.speeds = np.empty(0)
+        self.deviations = np.empty(0)
+        self.sample_segments = np.empty(0, dtype=np.int64)
+        self.cursor = 0
+        self.segments_used = 0
+        self.deviation = 0.0  # Deviation of the last reading sent
+        self.current_segment = None  # Segment of the last reading sent
+        self.segment_elapsed = 0.0  # Seconds of that segment already sent, across regenerations
+
+    def regenerate(self, segments, frequency):
+        """Recompute the remaining readings for a new sampling frequency"""
+        remaining = []
+        first_segment = self.segments_used
+        if self.cursor < len(self.speeds):
+            first_segment = int(self.sample_segments[self.cursor])
+            elapsed = self.segment_elapsed if first_segment == self.current_segment else 0.0
+            current = dict(segments[first_segment])
+            current["Time"] = max(0.0, current["Time"] - elapsed)
+            remaining = [current] + segments[first_segment + 1:self.segments_used]
+
+        speeds, deviations, sample_segments = generate_speed_trace(
+            remaining, frequency, self.rng, self.deviation)
+        self.speeds = speeds
+        self.deviations = deviations
+        self.sample_segments = sample_segments + first_segment
+        self.cursor = 0
+        self.frequency = frequency
+
+    def extend(self, segments):
+        """Append the readings of newly received segments, dropping the ones already sent"""
+        new_segments = segments[self.segments_used:]
+        speeds, deviations, sample_segments = generate_speed_trace(
+            new_segments, self.frequency, self.rng, self.deviation)
+        self.speeds = np.concatenate((self.speeds[self.cursor:], speeds))
+        self.deviations = np.concatenate((self.deviations[self.cursor:], deviations))
+        self.sample_segments = np.concatenate((self.sample_segments[self.cursor:],
+                                               sample_segments + self.segments_used))
+        self.cursor = 0
+        self.segments_used += len(new_segments)
+
+    def rewind(self):
+        """Start the route again from its first segment"""
+        self.speeds = np.empty(0)
+        self.deviations = np.empty(0)
+        self.sample_segments = np.empty(0, dtype=np.int64)
+        self.cursor = 0
+        self.segments_used = 0
+        self.current_segment = None
+        self.segment_elapsed = 0.0
+
+    def next_speed(self, segments, frequency):
+        """
+        Get the next odometer reading
+        Args:
+            segments: Speed inputs received so far
+            frequency: Current sampling period in seconds
+        Returns:
+            Speed in km/h, or None when every received segment has been sent
+        """
+        if frequency != self.frequency:
+            if self.frequency is None:
+                self.frequency = frequency
+            else:
+                self.regenerate(segments, frequency)
+        if self.cursor >= len(self.speeds) and self.segments_used < len(segments):
+            self.extend(segments)
+        if self.cursor >= len(self.speeds):
+            return None
+        speed = float(self.speeds[self.cursor])
+        self.deviation = float(self.deviations[self.cursor])
+        segment = int(self.sample_segments[self.cursor])
+        if segment != self.current_segment:
+            self.current_segment = segment
+            self.segment_elapsed = 0.0
+        self.segment_elapsed += self.frequency
+        self.cursor += 1
+        return speed
@@ -1,6 +1,5 @@
 # Import required libraries
 import os         # For environment variables
-import socket    # For TCP/IP communication
 import json      # For message formatting
 import time      # For sleep delays
 import threading # For parallel execution
@@ -8,10 +7,14 @@ import datetime  # For timestamps
 import random    # For simulation variations
 import math      # For mathematical operations
 from GracefulKiller import GracefulKiller  # For graceful shutdown handling
+from Transport import listen, connect  # For connections between components
 
 # Initialize monitor for graceful shutdown
 monitor = GracefulKiller()
 
+# Global list to store position inputs from route generator
+simulation_inputs = []
+
 # Default sampling frequency in seconds
 frequency = 1.0
 
@@ -24,14 +27,10 @@ def receive_simulation_inputs():
     Listen for and receive position/route data from route generator.
     Stores received coordinates and speeds in global simulation_inputs list.
     """
-    global simulation_inputs
-    simulation_inputs = []
     HOST = get_host_name()
     PORT = int(os.getenv("GNSS_SIMULATOR_PORT"))
     
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HOST, PORT))
-        s.listen()
+    with listen(HOST, PORT) as s:
         conn, addr = s.accept()
         with conn:
             print(f"Connected by {addr}")
@@ -55,10 +54,14 @@ def simulate_positioning():
     UC_SIMULATOR_HOST = os.getenv("UC_SIMULATOR_HOST")
     UC_SIMULATOR_PORT = int(os.getenv("UC_SIMULATOR_PORT"))
     
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((UC_SIMULATOR_HOST, UC_SIMULATOR_PORT))
+    with connect(UC_SIMULATOR_HOST, UC_SIMULATOR_PORT, monitor) as s:
         
         while not monitor.kill_now:
+            # Wait for route data
+            if not simulation_inputs:
+                time.sleep(0.1)
+                continue
+
             # Process each position/route segment
             for position in simulation_inputs:
                 # Calculate number of position updates based on time and frequency
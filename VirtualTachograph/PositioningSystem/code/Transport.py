@@ -0,0 +1,179 @@
+import time
+import queue
+import socket
+import logging
+import threading
+
+# Reconnection backoff of clients (seconds)
+CONNECT_BACKOFF_INITIAL = 0.05
+CONNECT_BACKOFF_MAX = 5.0
+
+# In-memory transport, used when every component runs in the same process
+memory_transport = False
+memory_listeners = {}
+memory_lock = threading.Lock()
+client = threading.local()
+
+
+def use_memory_transport():
+    """Connect the components through in-memory queues instead of TCP sockets"""
+    global memory_transport
+    memory_transport = True
+
+
+def set_client_name(name):
+    """Name the connections opened by the current thread (the peer hostname on in-memory connections)"""
+    client.name = name
+
+
+class MemoryConnection:
+    """
+    One end of an in-memory connection.
+    Offers the socket methods used by the components; every sendall is
+    received by a single recv on the other end, like the sensor protocol expects.
+    """
+    def __init__(self, inbound, outbound):
+        self.inbound = inbound
+        self.outbound = outbound
+        self.buffer = b""
+        self.peer_closed = False
+        self.closed = False
+        self.timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def sendall(self, data):
+        if self.closed:
+            raise OSError("Connection closed")
+        self.outbound.put(bytes(data))
+
+    def recv(self, size, flags=0):
+        if not self.buffer and not self.peer_closed:
+            try:
+                chunk = self.inbound.get(timeout=self.timeout)
+            except queue.Empty:
+                raise socket.timeout("timed out")
+            if chunk is None:
+                self.peer_closed = True
+            else:
+                self.buffer = chunk
+        data = self.buffer[:size]
+        if not flags & socket.MSG_PEEK:
+            self.buffer = self.buffer[size:]
+        return data
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.outbound.put(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class MemoryListener:
+    """In-memory listening endpoint, registered by port"""
+    def __init__(self, port):
+        self.port = port
+        self.pending = queue.Queue()
+        self.timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def accept(self):
+        try:
+            return self.pending.get(timeout=self.timeout)
+        except queue.Empty:
+            raise socket.timeout("timed out")
+
+    def close(self):
+        with memory_lock:
+            if memory_listeners.get(self.port) is self:
+                del memory_listeners[self.port]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def listen(host, port, backlog=None):
+    """
+    Open a listening endpoint
+    Args:
+        host: Address to bind (ignored by the in-memory transport, which shares one port space)
+        port: Port to listen on
+        backlog: Pending connections (socket default if None)
+    Returns:
+        Listening socket or MemoryListener
+    """
+    if memory_transport:
+        listener = MemoryListener(port)
+        with memory_lock:
+            if port in memory_listeners:
+                raise OSError(f"Port {port} already in use")
+            memory_listeners[port] = listener
+        return listener
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        s.bind((host, port))
+        if backlog is None:
+            s.listen()
+        else:
+            s.listen(backlog)
+    except OSError:
+        s.close()
+        raise
+    return s
+
+
+def connect_once(host, port):
+    """Single connection attempt"""
+    if not memory_transport:
+        return socket.create_connection((host, port))
+
+    with memory_lock:
+        listener = memory_listeners.get(port)
+    if listener is None:
+        raise ConnectionRefusedError(f"Nothing listening on port {port}")
+    to_server, to_client = queue.Queue(), queue.Queue()
+    listener.pending.put((MemoryConnection(to_server, to_client), (getattr(client, "name", "localhost"), 0)))
+    return MemoryConnection(to_client, to_server)
+
+
+def connect(host, port, monitor):
+    """
+    Connect to a component, retrying with exponential backoff until it listens
+    Args:
+        host: Host of the component
+        port: Port of the component
+        monitor: GracefulKiller that stops the retries
+    Returns:
+        Connected socket or MemoryConnection
+    """
+    backoff = CONNECT_BACKOFF_INITIAL
+    while not monitor.kill_now:
+        try:
+            return connect_once(host, port)
+        except OSError as e:
+            logging.warning(f"Connection to {host}:{port} failed ({e}), retrying in {backoff:.2f} seconds")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, CONNECT_BACKOFF_MAX)
+    raise ConnectionAbortedError(f"Stopped before connecting to {host}:{port}")
+
+
+def resolve_peer_name(address):
+    """Host name of a connected peer (the client name on in-memory connections)"""
+    if memory_transport:
+        return address[0]
+    try:
+        return socket.gethostbyaddr(address[0])[0]
+    except (socket.herror, socket.gaierror):
+        return address[0]
@@ -1,6 +1,5 @@
 # Import required libraries
 import threading  # For parallel execution
-import socket    # For TCP/IP communication
 import json      # For message formatting
 import time      # For delays
 import os        # For environment variables
@@ -8,6 +7,7 @@ import requests  # For HTTP requests
 import datetime  # For timestamps
 from math import acos, cos, sin, radians  # For geographical calculations
 from GracefulKiller import GracefulKiller  # For graceful shutdown handling
+from Transport import connect  # For connections between components
 
 # Initialize monitor for graceful shutdown
 monitor = GracefulKiller()
@@ -23,6 +23,21 @@ def generate_route_simulations(origin_address, destination_address):
     """
     print("Assigning a route to the vehicle")
     
+    # Extract route steps and generate simulation data
+    steps = request_route_steps(origin_address, destination_address)
+    print(f"API Response: {len(steps)} steps")
+    return generate_positions_speeds(steps)
+
+def request_route_steps(origin_address, destination_address, session=requests):
+    """
+    Request a driving route between two addresses from Google Routes API
+    Args:
+        origin_address: Starting location address
+        destination_address: Ending location address
+        session: requests module or Session used for the HTTP call
+    Returns:
+        List of route steps
+    """
     # Prepare API request body
     my_body = {
         "origin": {"address": origin_address},
@@ -41,12 +56,9 @@ def generate_route_simulations(origin_address, destination_address):
     
     # Call Google Routes API
     api_url = "https://routes.googleapis.com/directions/v2:computeRoutes"
-    response = requests.post(api_url, json=my_body, headers=my_headers)
-    print("API Response:", response.text)
-    
-    # Extract route steps and generate simulation data
-    steps = response.json()["routes"][0]["legs"][0]["steps"]
-    return generate_positions_speeds(steps)
+    response = session.post(api_url, json=my_body, headers=my_headers)
+    response.raise_for_status()
+    return response.json()["routes"][0]["legs"][0]["steps"]
 
 def generate_positions_speeds(steps):
     """
@@ -148,8 +160,7 @@ def send_positions_to_gps_simulator(positions_to_simulate):
     if GPS_SIMULATOR_PORT is None:
         raise ValueError("Missing environment variable: GPS_SIMULATOR_PORT")
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((GPS_SIMULATOR_HOST, GPS_SIMULATOR_PORT))
+    with connect(GPS_SIMULATOR_HOST, GPS_SIMULATOR_PORT, monitor) as s:
         for position in positions_to_simulate:
             s.sendall(bytes(json.dumps(position), "utf-8"))
             data = s.recv(1024)
@@ -167,37 +178,48 @@ def send_speeds_to_odometer_simulator(speeds_to_simulate):
     if ODOMETER_SIMULATOR_PORT is None:
         raise ValueError("Missing environment variable: ODOMETER_SIMULATOR_PORT")
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((ODOMETER_SIMULATOR_HOST, ODOMETER_SIMULATOR_PORT))
+    with connect(ODOMETER_SIMULATOR_HOST, ODOMETER_SIMULATOR_PORT, monitor) as s:
         for speed in speeds_to_simulate:
             s.sendall(bytes(json.dumps(speed), "utf-8"))
             data = s.recv(1024)
             print(f"{datetime.datetime.now()} - Sent speed: {json.dumps(speed)}")
             time.sleep(speed["Time"])
 
+def simulate_route(my_route):
+    """
+    Generate the simulation data of a route and send it to the GPS and odometer simulators
+    Args:
+        my_route: {"Origin", "Destination"} addresses
+    """
+    # Generate simulation data, from the route catalogue if one is configured
+    ROUTES_CATALOGUE = os.getenv("ROUTES_CATALOGUE")
+    if ROUTES_CATALOGUE:
+        from RouteCatalogue import open_catalogue, draw_route
+        positions_to_simulate, speeds_to_simulate = draw_route(open_catalogue(ROUTES_CATALOGUE), my_route)
+    else:
+        positions_to_simulate, speeds_to_simulate = generate_route_simulations(
+            my_route["Origin"], 
+            my_route["Destination"]
+        )
+    
+    # Create and start simulation threads
+    t1 = threading.Thread(target=send_positions_to_gps_simulator, 
+                        args=(positions_to_simulate,), 
+                        daemon=True)
+    t2 = threading.Thread(target=send_speeds_to_odometer_simulator, 
+                        args=(speeds_to_simulate,), 
+                        daemon=True)
+    
+    t1.start()
+    t2.start()
+    t1.join()
+    t2.join()
+
 # Main execution block
 if __name__ == '__main__':
     try:
         # Define route endpoints
         my_route = {"Origin": "Ayuntamiento de Leganés", "Destination": "Ayuntamiento de Getafe"}
-        
-        # Generate simulation data
-        positions_to_simulate, speeds_to_simulate = generate_route_simulations(
-            my_route["Origin"], 
-            my_route["Destination"]
-        )
-        
-        # Create and start simulation threads
-        t1 = threading.Thread(target=send_positions_to_gps_simulator, 
-                            args=(positions_to_simulate,), 
-                            daemon=True)
-        t2 = threading.Thread(target=send_speeds_to_odometer_simulator, 
-                            args=(speeds_to_simulate,), 
-                            daemon=True)
-        
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
+        simulate_route(my_route)
     except Exception as e:
         print(e)
@@ -0,0 +1,195 @@
+# Import required libraries
+import os         # For environment variables
+import json       # For route pairs and route storage
+import zlib       # For compact route storage
+import time       # For rate limiting
+import random     # For drawing routes
+import sqlite3    # For the on-disk catalogue
+import datetime   # For timestamps
+import threading  # For the shared rate limiter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import requests   # For HTTP requests
+from requests.adapters import HTTPAdapter  # For the bounded connection pool
+
+# Batch configuration
+ROUTES_BATCH_FILE = os.getenv("ROUTES_BATCH_FILE")  # JSON lines file of {"Origin": ..., "Destination": ...}
+ROUTES_CATALOGUE = os.getenv("ROUTES_CATALOGUE", "routes_catalogue.sqlite")  # Catalogue file
+ROUTES_API_CONNECTIONS = int(os.getenv("ROUTES_API_CONNECTIONS", "8"))  # Concurrent requests to the routes provider
+ROUTES_API_RATE = float(os.getenv("ROUTES_API_RATE", "10"))  # Max requests per second to the routes provider
+ROUTES_PREPROCESS_WORKERS = int(os.getenv("ROUTES_PREPROCESS_WORKERS", "0")) or os.cpu_count()  # Preprocessing processes
+COMMIT_EVERY = 100  # Routes stored per catalogue transaction
+
+
+class RateLimiter:
+    """Spaces out requests evenly across all fetch threads"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until the caller may send its request"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def open_catalogue(path):
+    """
+    Open the route catalogue, creating it if needed
+    Args:
+        path: SQLite file of the catalogue
+    Returns:
+        sqlite3 connection
+    """
+    catalogue = sqlite3.connect(path)
+    catalogue.execute("""CREATE TABLE IF NOT EXISTS routes (
+                             id INTEGER PRIMARY KEY,
+                             origin TEXT NOT NULL,
+                             destination TEXT NOT NULL,
+                             duration REAL NOT NULL,
+                             distance REAL NOT NULL,
+                             segments INTEGER NOT NULL,
+                             positions BLOB NOT NULL,
+                             UNIQUE (origin, destination))""")
+    catalogue.execute("CREATE INDEX IF NOT EXISTS routes_duration ON routes (duration)")
+    return catalogue
+
+
+def store_route(catalogue, route, positions_to_simulate):
+    """
+    Store a preprocessed route in the catalogue
+    Args:
+        catalogue: Catalogue connection
+        route: Dictionary with Origin and Destination addresses
+        positions_to_simulate: Positions generated by generate_positions_speeds
+    """
+    duration = sum(position["Time"] for position in positions_to_simulate)
+    distance = sum(position["Speed"] / 3.6 * position["Time"] for position in positions_to_simulate)
+    catalogue.execute(
+        "INSERT OR REPLACE INTO routes (origin, destination, duration, distance, segments, positions) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (route["Origin"], route["Destination"], duration, distance, len(positions_to_simulate),
+         zlib.compress(bytes(json.dumps(positions_to_simulate), "utf-8"))))
+
+
+def decode_positions(blob):
+    """Decode the positions of a catalogue route"""
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def draw_route(catalogue, route=None, rng=random):
+    """
+    Get a route from the catalogue
+    Args:
+        catalogue: Catalogue connection
+        route: Dictionary with Origin and Destination, random route if missing from the catalogue
+        rng: Random generator used to draw a route
+    Returns:
+        Tuple of (positions_to_simulate, speeds_to_simulate)
+    """
+    row = None
+    if route is not None:
+        row = catalogue.execute("SELECT positions FROM routes WHERE origin = ? AND destination = ?",
+                                (route["Origin"], route["Destination"])).fetchone()
+    if row is None:
+        first, last = catalogue.execute("SELECT MIN(id), MAX(id) FROM routes").fetchone()
+        if first is None:
+            raise ValueError("Route catalogue is empty")
+        row = catalogue.execute("SELECT positions FROM routes WHERE id >= ? ORDER BY id LIMIT 1",
+                                (rng.randint(first, last),)).fetchone()
+
+    positions_to_simulate = decode_positions(row[0])
+    speeds_to_simulate = [{"Speed": position["Speed"], "Time": position["Time"]}
+                          for position in positions_to_simulate]
+    return positions_to_simulate, speeds_to_simulate
+
+
+def read_route_pairs(path):
+    """
+    Read origin/destination pairs
+    Args:
+        path: JSON lines file, one {"Origin": ..., "Destination": ...} per line
+    Returns:
+        List of route dictionaries
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_catalogue(pairs_file, catalogue_path):
+    """
+    Fetch and preprocess many routes into the catalogue.
+    Routes are fetched concurrently through a bounded connection pool and a
+    shared rate limiter, decoded and segmented across a process pool as soon
+    as each fetch completes, and stored as soon as they are preprocessed,
+    committing every COMMIT_EVERY routes. Pairs already in the catalogue are
+    skipped, so an interrupted run can be resumed.
+    """
+    from GenerateRoutes import request_route_steps, generate_positions_speeds, monitor
+
+    catalogue = open_catalogue(catalogue_path)
+    known = set(catalogue.execute("SELECT origin, destination FROM routes"))
+    pairs = [pair for pair in read_route_pairs(pairs_file) if (pair["Origin"], pair["Destination"]) not in known]
+    print(f"{datetime.datetime.now()} - {len(pairs)} routes to generate")
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=ROUTES_API_CONNECTIONS))
+    limiter = RateLimiter(ROUTES_API_RATE)
+
+    def fetch(pair):
+        limiter.wait()
+        return request_route_steps(pair["Origin"], pair["Destination"], session)
+
+    stored = 0
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=ROUTES_PREPROCESS_WORKERS) as preprocessors:
+            # Start the preprocessing processes before any fetch thread runs, so none is forked from a busy process
+            preprocessors.submit(int).result()
+            with ThreadPoolExecutor(max_workers=ROUTES_API_CONNECTIONS) as fetchers:
+                # Futures of both stages, with the stage and the pair they belong to
+                pending = {fetchers.submit(fetch, pair): ("fetch", pair) for pair in pairs}
+                try:
+                    while pending and not monitor.kill_now:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            stage, pair = pending.pop(future)
+                            try:
+                                result = future.result()
+                            except (requests.RequestException, ArithmeticError, LookupError, ValueError,
+                                    TypeError, AttributeError) as e:
+                                failed += 1
+                                print(f"{datetime.datetime.now()} - Failed to {stage} route "
+                                      f"{pair['Origin']} -> {pair['Destination']}: {e}")
+                                continue
+
+                            if stage == "fetch":
+                                pending[preprocessors.submit(generate_positions_speeds, result)] = ("preprocess", pair)
+                            else:
+                                positions_to_simulate, _ = result
+                                store_route(catalogue, pair, positions_to_simulate)
+                                stored += 1
+                                if stored % COMMIT_EVERY == 0:
+                                    catalogue.commit()
+                                    print(f"{datetime.datetime.now()} - Stored {stored} routes")
+                finally:
+                    # Stopped or failed: drop the work not started yet
+                    for future in pending:
+                        future.cancel()
+    finally:
+        # Keep the routes stored so far whatever stopped the run, so it can be resumed
+        catalogue.commit()
+        catalogue.close()
+    print(f"{datetime.datetime.now()} - Catalogue complete: {stored} stored, {failed} failed")
+
+
+if __name__ == '__main__':
+    try:
+        if ROUTES_BATCH_FILE is None:
+            raise ValueError("Missing environment variable: ROUTES_BATCH_FILE")
+        build_catalogue(ROUTES_BATCH_FILE, ROUTES_CATALOGUE)
+    except Exception as e:
+        print(e)